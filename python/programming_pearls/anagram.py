@@ -0,0 +1,514 @@
+# -*- coding: UTF-8 -*-
+'''
+变位词分组，代替 token.py | sort | reduce.py 这条管道，输出完全相同：
+
+cat word.txt | python token.py | LC_ALL=C sort | python reduce.py
+python anagram.py word.txt
+cat word.txt | python anagram.py
+# 多进程：按块读入，签名按哈希分到各个分区，最后合并，输出与单进程相同
+python anagram.py -j 8 /data/words.txt
+# 内存放不下时：排好序的 (签名, 单词) 分批写到临时文件，再多路归并
+python anagram.py --memory 512M /data/words.txt
+# 换一种签名：字母计数或质数乘积，输出不变
+python anagram.py --signature count word.txt
+
+每个单词算出签名（单词的字节排好序），以签名为键放进字典分组，
+最后只对签名排序一次，组内的单词再排序，不需要把每个单词序列化成文本三次、
+也不需要外部的sort。
+'''
+from __future__ import print_function
+
+import argparse
+import heapq
+import io
+import multiprocessing
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import zlib
+
+from reduce import group_sorted
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+if isinstance(b'a'[0], int):
+    def signature(word):
+        """单词的所有字节排好序，互为变位词的单词签名相同"""
+        return bytes(sorted(word))
+else:
+    def signature(word):
+        """单词的所有字节排好序，互为变位词的单词签名相同"""
+        return ''.join(sorted(word))
+
+
+if isinstance(b'a'[0], int):
+    _ints = bytes
+else:
+    _ints = bytearray
+
+# 26个字母对应的质数，互为变位词当且仅当乘积相同
+PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41,
+          43, 47, 53, 59, 61, 67, 71, 73, 79, 83, 89, 97, 101)
+# 质数乘积签名的上界，不小于它的单词用排序签名
+PRIME_LIMIT = 1 << 63
+
+
+def _lowercase(word):
+    return word.isalpha() and word.islower()
+
+
+def count_signature(word):
+    """只由小写字母组成的单词：26个字母各自出现的次数，每个次数一个字节
+
+    不需要排序，也不需要逐个比较字节。其他单词（含大写、数字、非ASCII字节，
+    或长于254）用 b'\\xff' 加上排序签名，计数签名的第一个字节不会是255，两种签名不会相同。
+    """
+    if len(word) < 255 and _lowercase(word):
+        counts = bytearray(26)
+        for c in _ints(word):
+            counts[c - 97] += 1
+        return bytes(counts)
+    return b'\xff' + signature(word)
+
+
+def prime_signature(word):
+    """只由小写字母组成的单词：各字母对应质数的乘积，乘积小于2**63时是一个int
+
+    其他单词和乘积太大的单词用排序签名，int和bytes不会相等。
+    """
+    if _lowercase(word):
+        product = 1
+        for c in _ints(word):
+            product *= PRIMES[c - 97]
+        if product < PRIME_LIMIT:
+            return product
+    return signature(word)
+
+
+# --signature 的选项
+SIGNATURES = {
+    'sort': signature,
+    'count': count_signature,
+    'prime': prime_signature,
+}
+
+
+def read_words(f):
+    """每行一个单词，去掉首尾空白，跳过空行"""
+    for line in f:
+        word = line.strip()
+        if word:
+            yield word
+
+
+def group_anagrams(words, key=signature):
+    """签名 -> 单词列表"""
+    groups = {}
+    for word in words:
+        k = key(word)
+        group = groups.get(k)
+        if group is None:
+            groups[k] = [word]
+        else:
+            group.append(word)
+    return groups
+
+
+# 每次读入、交给一个工作进程的字节数
+BLOCK_SIZE = 8 << 20
+
+
+def read_blocks(f, block_size=BLOCK_SIZE):
+    """按大块读文件对象，每块在最后一个换行处截断，剩下的半行接到下一块"""
+    rest = b''
+    while True:
+        data = f.read(block_size)
+        if not data:
+            break
+        cut = data.rfind(b'\n') + 1
+        if cut == 0:
+            rest += data
+            continue
+        yield rest + data[:cut]
+        rest = data[cut:]
+    if rest:
+        yield rest
+
+
+def _words_in_block(block):
+    for line in block.split(b'\n'):
+        word = line.strip()
+        if word:
+            yield word
+
+
+_WHITESPACE = b' \t\n\r\x0b\x0c'
+if np is not None:
+    # 字母对应的质数和它的对数，下标26是非字母，当作1
+    _PRIME_TABLE = np.array(PRIMES + (1,), dtype=np.uint64)
+    _LOG_TABLE = np.log2(_PRIME_TABLE.astype(np.float64))
+
+
+def _key_dtype(nrows, width):
+    # 行号*width 放得进32位时用32位整数，排序快一些
+    return np.uint32 if nrows * width < 1 << 32 else np.int64
+
+
+def _sort_rows(data, row, newline):
+    """把每一行的字节排好序，换行符仍在行末，返回排好序的整块
+
+    (行号, 字节) 编码成一个整数 行号*512+字节，换行符编码为256，
+    整块只排一次序，不需要逐个单词调用sorted。
+    """
+    dtype = _key_dtype(len(row) and int(row[-1]) + 1, 512)
+    comp = row.astype(dtype) * 512 + np.where(newline, 256, data.astype(dtype))
+    comp.sort()
+    comp &= 511
+    comp[comp == 256] = 10
+    return comp.astype(np.uint8)
+
+
+def _batch_keys(data, strategy):
+    """一块里每一行的签名，返回 (签名列表, 需要逐个计算的行号)
+
+    需要逐个计算的行（空行、含空白的行，计数和质数签名中不全是小写字母的行、
+    太长的行）在签名列表中的位置是None。
+    """
+    newline = data == 10
+    row = np.cumsum(newline) - newline
+    nrows = int(row[-1]) + 1
+    # 每一行都包括它的换行符（最后一行可能没有），所以各行的起点互不相同
+    starts = np.zeros(nrows, dtype=np.int64)
+    starts[1:] = np.flatnonzero(newline)[:nrows - 1] + 1
+    lengths = np.add.reduceat(~newline, starts, dtype=np.int64)
+    if strategy == 'sort':
+        bad = np.isin(data, np.frombuffer(_WHITESPACE, np.uint8)) & ~newline
+        ok = (np.add.reduceat(bad, starts, dtype=np.int64) == 0) & (lengths > 0)
+        keys = _sort_rows(data, row, newline).tobytes().split(b'\n')
+        del keys[nrows:]
+    else:
+        letter = (data >= 97) & (data <= 122)
+        bad = ~letter & ~newline
+        ok = (np.add.reduceat(bad, starts, dtype=np.int64) == 0) & (lengths > 0) & (lengths < 255)
+    if strategy == 'count':
+        # 排好序之后同一行同一个字母连在一起，每一段的长度就是这个字母的个数
+        comp = row[letter].astype(_key_dtype(nrows, 26)) * 26 + (data[letter] - 97)
+        comp.sort()
+        counts = np.zeros(nrows * 26, dtype=np.uint8)
+        if len(comp):
+            first = np.flatnonzero(np.concatenate(([True], comp[1:] != comp[:-1])))
+            counts[comp[first]] = np.diff(np.append(first, len(comp)))
+        buf = counts.tobytes()
+        keys = [buf[i:i + 26] for i in range(0, len(buf), 26)]
+    elif strategy == 'prime':
+        # 非字母的字节当作1，每一行的乘积和对数和各用一次reduceat
+        index = np.where(letter, data - 97, 26)
+        products = np.multiply.reduceat(_PRIME_TABLE[index], starts)
+        # 对数和离63太近的乘积可能已经溢出，交给逐个计算的 prime_signature
+        ok &= np.add.reduceat(_LOG_TABLE[index], starts) < 62
+        keys = products.tolist()
+    rest = np.flatnonzero(~ok)
+    for i in rest.tolist():
+        keys[i] = None
+    return keys, rest
+
+
+def block_signatures(block, key=signature):
+    """一块里所有单词的签名，返回 (签名列表, 单词列表)，与逐个调用 key 的结果相同
+
+    key是 SIGNATURES 中的函数且有numpy时，把整块当作一个uint8数组一次算出
+    大部分单词的签名，只有不能向量化的行（含空白、大写字母等）逐个计算。
+    """
+    strategy = None
+    for name, func in SIGNATURES.items():
+        if func is key:
+            strategy = name
+    if np is None or strategy is None or not block:
+        words = list(_words_in_block(block))
+        return [key(word) for word in words], words
+    keys, rest = _batch_keys(np.frombuffer(block, dtype=np.uint8), strategy)
+    words = block.split(b'\n')
+    del words[len(keys):]
+    empty = False
+    for i in rest.tolist():
+        word = words[i].strip()
+        if word:
+            keys[i] = key(word)
+            words[i] = word
+        else:
+            empty = True
+    if empty:
+        pairs = [(k, word) for k, word in zip(keys, words) if k is not None]
+        keys = [k for k, _ in pairs]
+        words = [word for _, word in pairs]
+    return keys, words
+
+
+def _partition(k, partitions):
+    # 分区不能用hash()，python3的hash对每个进程随机化
+    if isinstance(k, bytes):
+        return zlib.crc32(k) % partitions
+    return k % partitions
+
+
+def _map_block(task):
+    """工作进程：算出一块里每个单词的签名，在块内先分组，各组按签名分到partitions个分区
+
+    每个分区的结果是一个字节串，组内的单词用换行分隔、组之间用空行分隔，
+    进程之间传递时只需要拷贝几个大字节串，而不是序列化上百万个小对象。
+    签名本身不传递，不同的签名算法得到相同的分组。
+    """
+    block, partitions, key = task
+    keys, words = block_signatures(block, key)
+    groups = {}
+    for k, word in zip(keys, words):
+        group = groups.get(k)
+        if group is None:
+            groups[k] = [word]
+        else:
+            group.append(word)
+    shards = [[] for _ in range(partitions)]
+    for k, group in groups.items():
+        shards[_partition(k, partitions)].append(b'\n'.join(group))
+    return [b'\n\n'.join(chunks) for chunks in shards]
+
+
+def _reduce_partition(blobs):
+    """工作进程：合并一个分区在各块中的分组，返回按输出顺序排好的 (排序键, 单词列表)
+
+    每组的排序签名由组里的第一个单词算出，输出顺序与签名算法无关。
+    """
+    groups = {}
+    for blob in blobs:
+        for chunk in blob.split(b'\n\n'):
+            words = chunk.split(b'\n')
+            k = signature(words[0])
+            group = groups.get(k)
+            if group is None:
+                groups[k] = words
+            else:
+                group.extend(words)
+    return sorted((_line_order(k), sorted(words)) for k, words in groups.items())
+
+
+def anagram_classes_parallel(blocks, workers=None, partitions=None, key=signature):
+    """多进程的anagram_classes，blocks 为若干整行组成的字节块，结果与 anagram_classes 相同
+
+    map：每块交给一个工作进程算签名、分组，按签名的哈希分成partitions个分区；
+    reduce：每个分区由一个工作进程分组、排序；
+    最后按签名顺序归并各分区的结果，所以输出与进程数、分区数无关。
+    """
+    workers = workers or multiprocessing.cpu_count()
+    partitions = partitions or workers
+    pool = multiprocessing.Pool(workers)
+    try:
+        shards = [[] for _ in range(partitions)]
+        tasks = ((block, partitions, key) for block in blocks)
+        for block_shards in pool.imap(_map_block, tasks):
+            for p in range(partitions):
+                # 单词不会是空串，空字节串说明这一块没有这个分区的单词
+                if block_shards[p]:
+                    shards[p].append(block_shards[p])
+        reduced = pool.map(_reduce_partition, [s for s in shards if s])
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    return [words for _, words in heapq.merge(*reduced)]
+
+
+def _line_order(sig):
+    # 管道里sort比较的是 "签名 单词" 整行，签名是另一个签名的前缀时，
+    # 比较的是空格和下一个字节，所以按 签名+空格 排序才和sort的结果一致
+    return sig + b' '
+
+
+def anagram_classes(words, key=signature):
+    """按 token.py | LC_ALL=C sort | reduce.py 的顺序返回各组单词
+
+    各组按签名排序，组内的单词按字节排序，重复的单词保留。
+    key 可以是 SIGNATURES 中的任何一种，分组之后再用每组第一个单词的排序签名定顺序。
+    """
+    groups = group_anagrams(words, key)
+    if key is not signature:
+        groups = dict((signature(group[0]), group) for group in groups.values())
+    return [sorted(groups[sig]) for sig in sorted(groups, key=_line_order)]
+
+
+# 临时文件中每条记录：签名长度、单词长度（各2字节，小端），然后是签名和单词
+_RECORD = struct.Struct('<HH')
+# 估算内存时每个 (签名, 单词) 除了字节本身之外的开销：一个元组和两个bytes对象
+_PAIR_OVERHEAD = 3 * 64
+# 一次最多归并的临时文件个数，更多时先归并成较大的文件，避免同时打开太多文件
+MERGE_FAN_IN = 64
+# 归并时每个临时文件的读缓冲
+RUN_BUFFER = 1 << 16
+
+
+def _write_run(pairs, directory):
+    """把排好序的 (排序键, 单词) 写成一个临时文件，返回路径"""
+    fd, path = tempfile.mkstemp(suffix='.run', dir=directory)
+    pack = _RECORD.pack
+    with os.fdopen(fd, 'wb') as f:
+        for k, word in pairs:
+            sig = k[:-1]
+            if len(sig) > 0xffff or len(word) > 0xffff:
+                raise ValueError('word too long: %r' % word[:32])
+            f.write(pack(len(sig), len(word)))
+            f.write(sig)
+            f.write(word)
+    return path
+
+
+def _read_run(path):
+    """依次返回临时文件中的 (排序键, 单词)"""
+    size = _RECORD.size
+    unpack = _RECORD.unpack
+    with io.open(path, 'rb', buffering=RUN_BUFFER) as f:
+        while True:
+            header = f.read(size)
+            if not header:
+                break
+            sig_len, word_len = unpack(header)
+            sig = f.read(sig_len)
+            yield _line_order(sig), f.read(word_len)
+
+
+def _merge_runs(paths, directory):
+    """多路归并，临时文件多于MERGE_FAN_IN个时分轮归并，返回 (排序键, 单词) 的迭代器"""
+    while len(paths) > MERGE_FAN_IN:
+        merged = []
+        for i in range(0, len(paths), MERGE_FAN_IN):
+            group = paths[i:i + MERGE_FAN_IN]
+            merged.append(_write_run(heapq.merge(*[_read_run(p) for p in group]), directory))
+            for p in group:
+                os.remove(p)
+        paths = merged
+    return heapq.merge(*[_read_run(p) for p in paths])
+
+
+def sorted_pairs_external(words, memory, directory=None):
+    """按输出顺序返回所有 (排序键, 单词)，内存中最多保留大约memory字节
+
+    攒够memory字节的 (签名, 单词) 就排序后写成一个临时文件，最后多路归并；
+    一次也没有写临时文件时直接在内存中排序。临时文件在迭代结束或关闭时删除。
+    归并的顺序就是输出的顺序，所以这里只能用排序签名，不接受其他签名算法。
+    """
+    directory = tempfile.mkdtemp(prefix='anagram-', dir=directory)
+    try:
+        runs = []
+        pairs = []
+        used = 0
+        for word in words:
+            k = _line_order(signature(word))
+            pairs.append((k, word))
+            used += len(k) + len(word) + _PAIR_OVERHEAD
+            if used >= memory:
+                pairs.sort()
+                runs.append(_write_run(pairs, directory))
+                pairs = []
+                used = 0
+        pairs.sort()
+        if runs:
+            if pairs:
+                runs.append(_write_run(pairs, directory))
+            del pairs[:]
+            merged = _merge_runs(runs, directory)
+        else:
+            merged = pairs
+        for pair in merged:
+            yield pair
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def anagram_classes_external(words, memory, directory=None):
+    """内存受限的anagram_classes，依次返回各组单词，结果与 anagram_classes 相同
+
+    归并出来的 (排序键, 单词) 已经是 sort 之后的顺序，直接交给 reduce.py 的
+    group_sorted 按签名分组，整个过程是流式的。
+    """
+    return group_sorted(sorted_pairs_external(words, memory, directory))
+
+
+def parse_size(text):
+    """'512M'、'2G'、'65536' 这样的大小转换成字节数"""
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    text = text.strip().upper().rstrip('B')
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def write_classes(classes, out):
+    """每组一行，单词之间用空格分隔，与 reduce.py 的输出相同"""
+    for words in classes:
+        out.write(b' '.join(words))
+        out.write(b'\n')
+
+
+def read_files(paths):
+    for path in paths:
+        with open(path, 'rb') as f:
+            for word in read_words(f):
+                yield word
+
+
+def _read_file_blocks(paths):
+    if not paths:
+        for block in read_blocks(_binary(sys.stdin)):
+            yield block
+    for path in paths:
+        with open(path, 'rb') as f:
+            for block in read_blocks(f):
+                yield block
+
+
+def _binary(f):
+    return getattr(f, 'buffer', f)
+
+
+def add_input_arguments(parser):
+    """单词文件和分组方式的命令行参数，anagram.py 和 anagram_index.py build 共用"""
+    parser.add_argument('files', nargs='*', help='one word per line, default stdin')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of worker processes, 0 for one per CPU')
+    parser.add_argument('--memory', type=parse_size,
+                        help='spill sorted runs to disk beyond this size, e.g. 512M')
+    parser.add_argument('--tmpdir', help='directory for the spilled runs')
+    parser.add_argument('--signature', choices=sorted(SIGNATURES), default='sort',
+                        help='signature used for grouping, the output is the same; '
+                             '--memory always sorts by the sorted-bytes signature')
+
+
+def classes_from_args(args):
+    """按 add_input_arguments 解析出的参数读单词、选择分组方式，返回按输出顺序的各组单词"""
+    key = SIGNATURES[args.signature]
+    if args.memory:
+        if args.files:
+            words = read_files(args.files)
+        else:
+            words = read_words(_binary(sys.stdin))
+        return anagram_classes_external(words, args.memory, directory=args.tmpdir)
+    if args.jobs != 1:
+        return anagram_classes_parallel(_read_file_blocks(args.files), args.jobs or None,
+                                        key=key)
+    if args.files:
+        return anagram_classes(read_files(args.files), key)
+    return anagram_classes(read_words(_binary(sys.stdin)), key)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(usage='python %(prog)s [-j N] [word_file ...]')
+    add_input_arguments(parser)
+    args = parser.parse_args(argv)
+    write_classes(classes_from_args(args), _binary(sys.stdout))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+# -*- coding: UTF-8 -*-
+'''
+变位词查询索引：分组的结果写成两个文件，查询时用mmap映射，二分查找签名，
+不需要把所有单词读进内存，也不需要每次重新分组。
+
+# 建索引，分组方式与 anagram.py 相同（-j 多进程，--memory 外部排序）
+python anagram_index.py build words.idx word.txt
+python anagram_index.py build --memory 512M words.idx /data/words.txt
+# 查询，每个单词输出一行它所在的变位词类，没有则输出空行
+python anagram_index.py query words.idx stop opt
+cat queries.txt | python anagram_index.py query words.idx
+
+PREFIX.table  按签名排序的各个变位词类，每类为 签名\\n单词1\\n单词2\\n...
+PREFIX.offsets  每类在 table 中的起点，8字节小端无符号整数，最后多一个 table 的长度
+'''
+from __future__ import print_function
+
+import argparse
+import mmap
+import os
+import struct
+import sys
+
+from anagram import (
+    _binary,
+    _line_order,
+    add_input_arguments,
+    classes_from_args,
+    read_words,
+    signature,
+    )
+
+
+_OFFSET = struct.Struct('<Q')
+
+
+def build_index(classes, prefix):
+    """把按签名排好序的变位词类（anagram_classes 等的结果）写成索引，返回类的个数
+
+    类的顺序与 anagram.py 的输出相同，即按 签名+空格 排序，查询时用同样的顺序二分。
+    """
+    count = 0
+    position = 0
+    last = None
+    with open(prefix + '.table', 'wb') as table, open(prefix + '.offsets', 'wb') as offsets:
+        for words in classes:
+            sig = signature(words[0])
+            if last is not None and _line_order(sig) <= last:
+                raise ValueError('classes are not sorted by signature: %r' % words[0])
+            last = _line_order(sig)
+            record = sig + b'\n' + b'\n'.join(words) + b'\n'
+            offsets.write(_OFFSET.pack(position))
+            table.write(record)
+            position += len(record)
+            count += 1
+        offsets.write(_OFFSET.pack(position))
+    return count
+
+
+def _map(f):
+    # 长度为0的文件不能mmap
+    f.seek(0, 2)
+    if f.tell() == 0:
+        return b''
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class AnagramIndex(object):
+    """build_index 写出的索引，只读
+
+    两个文件都映射到内存，只有查到的那几页才会真正读盘；
+    多个进程打开同一个索引时共享操作系统的页缓存。
+
+        >>> with AnagramIndex('words.idx') as index:
+        ...     index.lookup(b'pots')
+        [b'pots', b'stop', b'tops']
+    """
+
+    def __init__(self, prefix):
+        self._files = [open(prefix + '.table', 'rb'), open(prefix + '.offsets', 'rb')]
+        try:
+            self._table, self._offsets = [_map(f) for f in self._files]
+            size = len(self._offsets) // _OFFSET.size
+            if size == 0 or len(self._offsets) % _OFFSET.size or \
+                    self._offset(size - 1) != len(self._table):
+                raise ValueError('%s: offsets do not match the table' % prefix)
+            self.n = size - 1
+        except Exception:
+            self.close()
+            raise
+
+    def __len__(self):
+        return self.n
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        for data in (getattr(self, '_table', None), getattr(self, '_offsets', None)):
+            if isinstance(data, mmap.mmap):
+                data.close()
+        for f in self._files:
+            f.close()
+
+    def _offset(self, i):
+        return _OFFSET.unpack_from(self._offsets, i * _OFFSET.size)[0]
+
+    def _signature(self, i):
+        start = self._offset(i)
+        return self._table[start:self._table.find(b'\n', start)]
+
+    def find(self, sig):
+        """签名为sig的类的序号，没有时返回-1，O(log n) 次访问"""
+        key = _line_order(sig)
+        lo, hi = 0, self.n
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if _line_order(self._signature(mid)) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n and self._signature(lo) == sig:
+            return lo
+        return -1
+
+    def words(self, i):
+        """第i类的所有单词"""
+        start = self._offset(i)
+        record = self._table[start:self._offset(i + 1) - 1]
+        return record.split(b'\n')[1:]
+
+    def lookup(self, word):
+        """与word互为变位词的所有单词（包括word本身，如果它在词表里），没有时返回 []"""
+        i = self.find(signature(word.strip()))
+        if i < 0:
+            return []
+        return self.words(i)
+
+
+def _build(args):
+    count = build_index(classes_from_args(args), args.prefix)
+    print('%d classes' % count, file=sys.stderr)
+
+
+def _query(args):
+    out = _binary(sys.stdout)
+    if args.words:
+        words = [w if isinstance(w, bytes) else os.fsencode(w) for w in args.words]
+    else:
+        words = read_words(_binary(sys.stdin))
+    with AnagramIndex(args.prefix) as index:
+        for word in words:
+            out.write(b' '.join(index.lookup(word)))
+            out.write(b'\n')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command')
+
+    build = subparsers.add_parser('build', help='group a word list and write the index')
+    build.add_argument('prefix', help='writes PREFIX.table and PREFIX.offsets')
+    add_input_arguments(build)
+    build.set_defaults(func=_build)
+
+    query = subparsers.add_parser('query', help='print the anagram class of each word')
+    query.add_argument('prefix')
+    query.add_argument('words', nargs='*', help='words to look up, default one per line on stdin')
+    query.set_defaults(func=_query)
+
+    args = parser.parse_args(argv)
+    if not getattr(args, 'func', None):
+        parser.error('a command is required')
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
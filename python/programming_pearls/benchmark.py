@@ -0,0 +1,443 @@
+# -*- coding: utf-8 -*-
+'''
+programming_pearls 里各个实现的性能测试。
+
+# 一维最大子数组和：n从10到100万，立方的算法只跑到 --max-cubic，平方的只跑到 --max-quadratic
+python benchmark.py maxsum --max-n 1000000 --output maxsum.json
+# 与上次的结果比较，中位数变慢超过20%的组合会列出来，并以状态1退出
+python benchmark.py maxsum --baseline maxsum.json
+# 最大的n上用cProfile看某个算法的热点
+python benchmark.py maxsum --max-n 10000 --profile maxsum3
+
+# 二维最大子矩阵和，n为方阵的边长
+python benchmark.py maxsum2d --max-n 300
+
+# 变位词分组：anagram.py 与 token.py | sort | reduce.py 管道比较，--words 为单词个数
+python benchmark.py anagram --words 1000000
+# 签名算法：排序、字母计数、质数乘积，逐个计算与numpy整块计算
+python benchmark.py signature --words 1000000
+
+每个(算法, n)测若干次，每次自动加大调用次数直到耗时不少于 --min-time，
+报告单次调用时间的中位数和方差，并对 log(时间)-log(n) 做最小二乘拟合，
+斜率就是经验复杂度的指数。
+'''
+from __future__ import print_function
+
+import argparse
+import io
+import json
+import math
+import multiprocessing
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import anagram
+import maxsum
+
+
+CUBIC = 'n^3'
+QUADRATIC = 'n^2'
+# 拟合经验复杂度时只用最大的这几个n，n小的时候时间主要是固定开销
+FIT_POINTS = 4
+
+
+# (名字, 函数, 理论复杂度, 是否向量化)
+# 纯Python的立方算法只跑到 --max-cubic，平方算法只跑到 --max-quadratic；
+# 向量化的实现输入为numpy数组，不受这两个限制
+def algorithms():
+    topk = lambda arr: maxsum.maxsum_topk(arr, 10)[0][0]
+    result = [
+        ('maxsum1', maxsum.maxsum1, CUBIC, False),
+        ('maxsum2', maxsum.maxsum2, QUADRATIC, False),
+        ('maxsum3', maxsum.maxsum3, 'n log n', False),
+        ('maxsum4', maxsum.maxsum4, 'n', False),
+        ('maxsum_parallel', maxsum.maxsum_parallel, 'n', False),
+    ]
+    if maxsum.np is not None:
+        result.extend([
+            ('maxsum_numpy', lambda arr: maxsum.maxsum_numpy(arr)[0], 'n', True),
+            ('maxsum_topk_10', topk, 'n', True),
+        ])
+    else:
+        result.append(('maxsum_topk_10', topk, 'n', False))
+    return result
+
+
+def algorithms_2d():
+    result = [('maxsum2d_loop', lambda m: maxsum._maxsum2d_loop(m)[0], CUBIC, False)]
+    if maxsum.np is not None:
+        result.append(('maxsum2d_numpy', lambda m: maxsum._maxsum2d_numpy(m)[0], CUBIC, True))
+    return result
+
+
+def sizes(max_n, min_n=10):
+    """10, 30, 100, 300, ... 不超过max_n，每个数量级两个点"""
+    result = []
+    n = min_n
+    while n <= max_n:
+        result.append(n)
+        if n * 3 <= max_n:
+            result.append(n * 3)
+        n *= 10
+    return result
+
+
+def _median(values):
+    values = sorted(values)
+    mid = len(values) // 2
+    if len(values) % 2:
+        return values[mid]
+    return (values[mid - 1] + values[mid]) / 2.0
+
+
+def _variance(values):
+    mean = sum(values) / float(len(values))
+    return sum((v - mean) ** 2 for v in values) / len(values)
+
+
+def measure(func, arg, repeat=5, min_time=0.05):
+    """返回repeat次测量得到的单次调用时间列表，以及函数的返回值
+
+    n很小时一次调用太快，计时器分辨率不够，所以每次测量连续调用number次，
+    number从1开始翻倍，直到一次测量不少于min_time秒。
+    """
+    number = 1
+    while True:
+        t = time.time()
+        for _ in range(number):
+            result = func(arg)
+        elapsed = time.time() - t
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+    samples = [elapsed / number]
+    for _ in range(repeat - 1):
+        t = time.time()
+        for _ in range(number):
+            func(arg)
+        samples.append((time.time() - t) / number)
+    return samples, result
+
+
+def fit_exponent(points, last=FIT_POINTS):
+    """对n最大的last个点 [(n, 秒), ...] 做 log(秒) = k log(n) + b 的最小二乘拟合，返回k
+
+    有效的点少于两个时返回None。
+    """
+    points = [(math.log(n), math.log(t)) for n, t in sorted(points)[-last:] if t > 0]
+    if len(points) < 2:
+        return None
+    mx = sum(x for x, _ in points) / len(points)
+    my = sum(y for _, y in points) / len(points)
+    sxx = sum((x - mx) ** 2 for x, _ in points)
+    if sxx == 0:
+        return None
+    return sum((x - mx) * (y - my) for x, y in points) / sxx
+
+
+def _random_array(n, seed):
+    rnd = random.Random('maxsum-%d-%d' % (n, seed))
+    return [rnd.randint(-100, 100) for _ in range(n)]
+
+
+def _random_matrix(n, seed):
+    rnd = random.Random('maxsum2d-%d-%d' % (n, seed))
+    return [[rnd.randint(-100, 100) for _ in range(n)] for _ in range(n)]
+
+
+def sweep(candidates, make_input, ns, limits, repeat=5, min_time=0.05, seed=0):
+    """对每个n、每个算法测时间，返回结果列表
+
+    limits[复杂度] 为这一类纯Python算法最大的n；各算法在同一个n上的结果必须相同。
+    """
+    results = []
+    for n in ns:
+        data = make_input(n, seed)
+        expected = None
+        for name, func, complexity, vectorized in candidates:
+            if not vectorized and n > limits.get(complexity, n):
+                continue
+            arg = maxsum.np.array(data) if vectorized else data
+            samples, value = measure(func, arg, repeat, min_time)
+            if expected is None:
+                expected = value
+            elif value != expected:
+                raise AssertionError('%s(n=%d) returned %r, expected %r'
+                                     % (name, n, value, expected))
+            results.append({
+                'algorithm': name,
+                'n': n,
+                'median': _median(samples),
+                'variance': _variance(samples),
+                'min': min(samples),
+                'samples': samples,
+            })
+    return results
+
+
+def exponents(results):
+    """每个算法的经验复杂度指数"""
+    points = {}
+    for r in results:
+        points.setdefault(r['algorithm'], []).append((r['n'], r['median']))
+    return dict((name, fit_exponent(p)) for name, p in points.items())
+
+
+def compare(results, baseline, tolerance=0.2):
+    """返回中位数比baseline慢tolerance以上的 (结果, 基准中位数) 列表"""
+    key = lambda r: (r['algorithm'], r['n'])
+    base = dict((key(r), r['median']) for r in baseline)
+    slower = []
+    for r in results:
+        before = base.get(key(r))
+        if before and r['median'] > before * (1 + tolerance):
+            slower.append((r, before))
+    return slower
+
+
+def _profile(func, arg):
+    try:
+        import cProfile as profile
+    except ImportError:
+        import profile
+    import pstats
+    profiler = profile.Profile()
+    profiler.runcall(func, arg)
+    # ncalls   函数的被调用次数
+    # tottime  函数总计运行时间，除去函数中调用的函数运行时间
+    # cumtime  函数总计运行时间，含调用的函数运行时间
+    pstats.Stats(profiler, stream=sys.stderr).sort_stats('cumulative').print_stats(15)
+
+
+def _meta(args):
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': multiprocessing.cpu_count(),
+        'numpy': maxsum.np.__version__ if maxsum.np is not None else None,
+        'args': dict((k, v) for k, v in vars(args).items() if not callable(v)),
+    }
+
+
+def _run_profile(args, ns, limits):
+    for name, func, complexity, vectorized in args.candidates():
+        if name == args.profile:
+            n = max(n for n in ns if vectorized or n <= limits.get(complexity, n))
+            data = args.make_input(n, args.seed)
+            print('profile %s n=%d' % (name, n), file=sys.stderr)
+            _profile(func, maxsum.np.array(data) if vectorized else data)
+            return
+    print('unknown algorithm %s' % args.profile, file=sys.stderr)
+
+
+def _run_sweep(args):
+    ns = sizes(args.max_n)
+    limits = {CUBIC: args.max_cubic, QUADRATIC: args.max_quadratic}
+    results = sweep(args.candidates(), args.make_input, ns, limits,
+                    args.repeat, args.min_time, args.seed)
+
+    print('%-16s %9s %12s %12s' % ('algorithm', 'n', 'median(s)', 'stddev(s)'), file=sys.stderr)
+    for r in results:
+        print('%-16s %9d %12.3g %12.3g'
+              % (r['algorithm'], r['n'], r['median'], math.sqrt(r['variance'])), file=sys.stderr)
+    fitted = exponents(results)
+    for name, _, complexity, _ in args.candidates():
+        if name in fitted:
+            k = fitted[name]
+            print('%-16s ~ n^%s (expected %s)'
+                  % (name, '?' if k is None else '%.2f' % k, complexity), file=sys.stderr)
+
+    if args.profile:
+        _run_profile(args, ns, limits)
+
+    report = {'meta': _meta(args), 'results': results, 'exponents': fitted}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        slower = compare(results, baseline, args.tolerance)
+        for r, before in slower:
+            print('REGRESSION %s n=%d: median %.3g s, was %.3g s'
+                  % (r['algorithm'], r['n'], r['median'], before), file=sys.stderr)
+        if slower:
+            sys.exit(1)
+
+
+def _add_sweep_arguments(parser, max_n, max_cubic, max_quadratic):
+    parser.add_argument('--max-n', type=int, default=max_n)
+    parser.add_argument('--max-cubic', type=int, default=max_cubic,
+                        help='largest n for O(n^3) algorithms')
+    parser.add_argument('--max-quadratic', type=int, default=max_quadratic,
+                        help='largest n for O(n^2) algorithms')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help='minimum seconds per measurement')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--profile', metavar='ALGORITHM',
+                        help='profile ALGORITHM at the largest n it runs on')
+    parser.add_argument('--output', help='write JSON results here')
+    parser.add_argument('--baseline', help='JSON from an earlier run to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.2)
+    parser.set_defaults(func=_run_sweep)
+
+
+def make_word_file(count, seed=0):
+    """生成count个单词的临时文件，大约一半的单词属于有多个成员的变位词类，返回路径"""
+    rnd = random.Random('anagram-%d' % seed)
+    letters = 'abcdefghijklmnopqrstuvwxyz'
+    words = []
+    while len(words) < count:
+        base = [rnd.choice(letters) for _ in range(rnd.randint(3, 10))]
+        for _ in range(rnd.choice((1, 1, 2, 3, 5))):
+            rnd.shuffle(base)
+            words.append(''.join(base))
+    fd, path = tempfile.mkstemp(suffix='.words')
+    with os.fdopen(fd, 'w') as f:
+        f.write('\n'.join(words[:count]) + '\n')
+    return path
+
+
+def _in_process(path):
+    out = io.BytesIO()
+    anagram.write_classes(anagram.anagram_classes(anagram.read_files([path])), out)
+    return out.getvalue()
+
+
+def _in_process_parallel(path):
+    out = io.BytesIO()
+    with open(path, 'rb') as f:
+        classes = anagram.anagram_classes_parallel(anagram.read_blocks(f, 1 << 20))
+    anagram.write_classes(classes, out)
+    return out.getvalue()
+
+
+def _in_process_external(path):
+    out = io.BytesIO()
+    classes = anagram.anagram_classes_external(anagram.read_files([path]), 16 << 20)
+    anagram.write_classes(classes, out)
+    return out.getvalue()
+
+
+def _shell(command):
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, LC_ALL='C')
+    return subprocess.check_output(command, shell=True, cwd=here, env=env)
+
+
+def bench_anagram(count, repeat=3, seed=0):
+    """返回 [(方法, 秒)]，各方法的输出必须相同"""
+    path = make_word_file(count, seed)
+    python = '"%s"' % sys.executable
+    ways = [
+        ('anagram.anagram_classes', _in_process, path),
+        ('anagram_classes_parallel', _in_process_parallel, path),
+        ('anagram_classes_external 16M', _in_process_external, path),
+        ('python anagram.py', _shell, '%s anagram.py "%s"' % (python, path)),
+        ('token.py | sort | reduce.py', _shell,
+         '%s token.py < "%s" | sort | %s reduce.py' % (python, path, python)),
+    ]
+    results = []
+    expected = None
+    try:
+        for name, func, arg in ways:
+            samples = []
+            for _ in range(repeat):
+                t = time.time()
+                output = func(arg)
+                samples.append(time.time() - t)
+            if expected is None:
+                expected = output
+            elif output != expected:
+                raise AssertionError('%s produced different output' % name)
+            results.append((name, _median(samples)))
+    finally:
+        os.remove(path)
+    return results
+
+
+def _run_anagram(args):
+    results = bench_anagram(args.words, args.repeat, args.seed)
+    base = results[-1][1]
+    print('%-30s %10s %9s' % ('method', 'seconds', 'speedup'))
+    for name, seconds in results:
+        print('%-30s %10.3f %9.1f' % (name, seconds, base / seconds))
+
+
+def bench_signatures(count, repeat=3, seed=0):
+    """返回 [(签名算法, 实现, 每秒单词数)]，每种实现的签名必须与逐个计算的相同"""
+    path = make_word_file(count, seed)
+    try:
+        with open(path, 'rb') as f:
+            block = f.read()
+    finally:
+        os.remove(path)
+    words = list(anagram.read_words(io.BytesIO(block)))
+    results = []
+    for name in sorted(anagram.SIGNATURES):
+        key = anagram.SIGNATURES[name]
+        ways = [('scalar', lambda words: [key(word) for word in words], words)]
+        if maxsum.np is not None:
+            ways.append(('numpy batch',
+                         lambda block: anagram.block_signatures(block, key)[0], block))
+        expected = None
+        for way, func, arg in ways:
+            samples, keys = measure(func, arg, repeat)
+            if expected is None:
+                expected = keys
+            elif keys != expected:
+                raise AssertionError('%s %s produced different signatures' % (name, way))
+            results.append((name, way, len(words) / _median(samples)))
+    return results
+
+
+def _run_signature(args):
+    results = bench_signatures(args.words, args.repeat, args.seed)
+    base = results[0][2]
+    for name, way, rate in results:
+        if name == 'sort' and way == 'scalar':
+            base = rate
+    print('%-10s %-12s %14s %9s' % ('signature', 'method', 'words/s', 'speedup'))
+    for name, way, rate in results:
+        print('%-10s %-12s %14.0f %9.1f' % (name, way, rate, rate / base))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command')
+
+    sums = subparsers.add_parser('maxsum', help='maximum subarray algorithms')
+    _add_sweep_arguments(sums, 100000, 300, 3000)
+    sums.set_defaults(candidates=algorithms, make_input=_random_array)
+
+    sums2d = subparsers.add_parser('maxsum2d', help='maximum sub-rectangle algorithms')
+    _add_sweep_arguments(sums2d, 300, 100, 100)
+    sums2d.set_defaults(candidates=algorithms_2d, make_input=_random_matrix)
+
+    words = subparsers.add_parser('anagram', help='anagram grouping against the shell pipeline')
+    words.add_argument('--words', type=int, default=200000)
+    words.add_argument('--repeat', type=int, default=3)
+    words.add_argument('--seed', type=int, default=0)
+    words.set_defaults(func=_run_anagram)
+
+    keys = subparsers.add_parser('signature', help='anagram signature strategies')
+    keys.add_argument('--words', type=int, default=200000)
+    keys.add_argument('--repeat', type=int, default=3)
+    keys.add_argument('--seed', type=int, default=0)
+    keys.set_defaults(func=_run_signature)
+
+    args = parser.parse_args(argv)
+    if not getattr(args, 'func', None):
+        parser.error('a command is required')
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,27 @@
 # -*- coding: UTF-8 -*-
+from __future__ import print_function
+
+import heapq
+import multiprocessing
+import os
 import sys
 import random
+from array import array
+from functools import reduce
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# 《编程珠玑》第8章的例子
+EXAMPLE = [31, -41, 59, 26, -53, 58, 97, -93, -23, 84]
+
 
 def init_arr(num):
-    return [31, -41, 59, 26, -53, 58, 97, -93, -23, 84]
-    #return [random.randint(-100, 100) for i in xrange(num)]
+    return EXAMPLE
+    #return [random.randint(-100, 100) for i in range(num)]
 
 def  maxsum1(arr):
     n = len(arr)
@@ -36,7 +53,7 @@ def maxsum3_internal(arr, l, u):
     if (l == u):
         return max(0, arr[l])
 
-    m = (l + u) / 2
+    m = (l + u) // 2
 
     lmax = sum = 0
     for i in reversed(range(l, m + 1)):
@@ -59,38 +76,240 @@ def maxsum4(arr):
         maxsofar = max(maxsofar, maxendinghere)
     return maxsofar
 
-arr=init_arr(500);
-print arr
+def maxsum4_range(arr):
+    """和maxsum4相同的扫描，同时记录位置，返回 (最大和, start, end)
 
-if __name__ == '__main__':
-    from timeit import Timer
+    最大子数组为 arr[start:end]，全部为负数时是空数组 (0, 0, 0)。
+    有多个最大和时取结束位置最小的那个，结束位置相同时取最短的那个
+    （maxendinghere 小于等于0时就重新开始）。
+    """
+    maxsofar = 0
+    best_start = best_end = 0
+    maxendinghere = 0
+    start = 0
+    for i in range(len(arr)):
+        maxendinghere += arr[i]
+        if maxendinghere <= 0:
+            maxendinghere = 0
+            start = i + 1
+        elif maxendinghere > maxsofar:
+            maxsofar = maxendinghere
+            best_start, best_end = start, i + 1
+    return maxsofar, best_start, best_end
+
+def maxsum_numpy(arr):
+    """用前缀和向量化的maxsum4，返回值和maxsum4_range相同
+
+    prefix[j] 为前j个元素之和，以j结尾的最大子数组和就是
+    prefix[j] - min(prefix[0..j])，后者用 np.minimum.accumulate 一次求出，
+    整个计算没有Python层的循环，适合上千万个元素的数组。
+    整数数组按int64累加，结果和maxsum4完全一致；浮点数组的累加顺序不同，
+    结果可能有舍入误差。
+    """
+    prefix = _prefix_sums(arr)
+    low = np.minimum.accumulate(prefix)
+    gain = prefix - low
+    end = int(np.argmax(gain))
+    best = gain[end]
+    if best <= 0:
+        return 0, 0, 0
+    # 以end结尾的最大子数组从前缀和最后一次取到最小值的位置开始；
+    # 最小值要用low里的元素本身去找，浮点数的 prefix[end] - best 不一定和它相等
+    start = end - int(np.argmax(prefix[end::-1] == low[end]))
+    return best.item(), start, end
+
+def _prefix_sums(arr):
+    """长度为n+1的前缀和数组，整数按int64累加，其余按float64"""
+    if np is None:
+        raise ImportError('numpy is required')
+    arr = np.asarray(arr)
+    if arr.dtype.kind in 'biu':
+        dtype = np.int64
+    else:
+        dtype = np.float64
+    prefix = np.empty(len(arr) + 1, dtype=dtype)
+    prefix[0] = 0
+    np.cumsum(arr, dtype=dtype, out=prefix[1:])
+    return prefix
+
+
+# 分治法中一段数组用四个值概括：(总和, 最大前缀和, 最大后缀和, 最大子数组和)，
+# 后三个都允许取空数组，所以不小于0。两段的概括可以直接合并，不需要再扫描数组，
+# 合并满足结合律，各段可以在不同进程里独立计算。
+EMPTY_SUMMARY = (0, 0, 0, 0)
+
+def summarize(arr):
+    """一段数组的 (total, prefix, suffix, best)"""
+    if len(arr) == 0:
+        return EMPTY_SUMMARY
+    if np is not None:
+        prefix = _prefix_sums(arr)
+        total = prefix[-1]
+        low = np.minimum.accumulate(prefix)
+        best = (prefix - low).max()
+        return (total.item(), prefix.max().item(), (total - low[-1]).item(), best.item())
+    total = 0
+    best_prefix = 0
+    low = 0
+    best = 0
+    for x in arr:
+        total += x
+        best_prefix = max(best_prefix, total)
+        low = min(low, total)
+        best = max(best, total - low)
+    return total, best_prefix, total - low, best
 
-    t1=Timer("n = maxsum1(arr)\nprint n","from __main__ import arr, maxsum1")
-    print t1.timeit(number=1)
-    print t1.repeat(repeat=3,number=1)
+def combine(left, right):
+    """合并相邻两段的概括，left在前"""
+    ltotal, lprefix, lsuffix, lbest = left
+    rtotal, rprefix, rsuffix, rbest = right
+    return (ltotal + rtotal,
+            max(lprefix, ltotal + rprefix),
+            max(rsuffix, rtotal + lsuffix),
+            max(lbest, rbest, lsuffix + rprefix))
 
-    t2=Timer("n = maxsum2(arr)\nprint n","from __main__ import arr, maxsum2")
-    print t2.timeit(number=1)
-    print t2.repeat(repeat=3,number=1)
+def _split(n, parts):
+    """把 [0, n) 切成最多parts段"""
+    if n == 0:
+        return []
+    parts = max(1, min(parts, n))
+    step = -(-n // parts)
+    return [(start, min(start + step, n)) for start in range(0, n, step)]
 
-    t3=Timer("n = maxsum3(arr)\nprint n","from __main__ import arr, maxsum3")
-    print t3.timeit(number=1)
-    print t3.repeat(repeat=3,number=1)
+def _map_summaries(func, tasks, workers):
+    if workers == 1:
+        return [func(task) for task in tasks]
+    pool = multiprocessing.Pool(workers)
+    try:
+        # map 按提交顺序返回，合并不满足交换律，顺序不能乱
+        result = pool.map(func, tasks)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    return result
 
-    t4=Timer("n = maxsum4(arr)\nprint n","from __main__ import arr, maxsum4")
-    print t4.timeit(number=1)
-    print t4.repeat(repeat=3,number=1)
+def maxsum_parallel(arr, workers=None):
+    """多进程分治：每个进程概括一段，按顺序合并，返回和maxsum4相同的最大和"""
+    workers = workers or multiprocessing.cpu_count()
+    chunks = [arr[start:end] for start, end in _split(len(arr), workers * 4)]
+    return reduce(combine, _map_summaries(summarize, chunks, workers), EMPTY_SUMMARY)[3]
 
+# 每次从文件读入的元素个数
+BLOCK_ITEMS = 1 << 20
 
-    import profile
-    # ncalls  函数的被调用次数
-    # tottime  函数总计运行时间，除去函数中调用的函数运行时间
-    # percall  函数运行一次的平均时间，等于tottime/ncalls
-    # cumtime  函数总计运行时间，含调用的函数运行时间
-    # percall  函数运行一次的平均时间，等于cumtime/ncalls
-    # filename:lineno(function)  函数所在的文件名，函数的行号，函数名
-    profile.run("maxsum1(arr)")
-    profile.run("maxsum2(arr)")
-    profile.run("maxsum3(arr)")
-    profile.run("maxsum4(arr)")
+def _summarize_file_range(task):
+    """工作进程：按块读出文件中第start到end个元素，逐块概括再合并，内存只占一块"""
+    path, typecode, start, end = task
+    itemsize = array(typecode).itemsize
+    summary = EMPTY_SUMMARY
+    with open(path, 'rb') as f:
+        f.seek(start * itemsize)
+        while start < end:
+            block = array(typecode)
+            count = min(BLOCK_ITEMS, end - start)
+            block.fromfile(f, count)
+            summary = combine(summary, summarize(block))
+            start += count
+    return summary
 
+def maxsum_parallel_file(path, typecode='i', workers=None):
+    """二进制数组文件的最大子数组和，文件可以比内存大
+
+    文件内容是本机字节序的数组，typecode 与 array 模块相同（'i' 'l' 'd' 等）。
+    """
+    workers = workers or multiprocessing.cpu_count()
+    n = os.path.getsize(path) // array(typecode).itemsize
+    tasks = [(path, typecode, start, end) for start, end in _split(n, workers * 4)]
+    return reduce(combine, _map_summaries(_summarize_file_range, tasks, workers),
+                  EMPTY_SUMMARY)[3]
+
+def _maxsum_range(arr):
+    if np is not None:
+        return maxsum_numpy(arr)
+    return maxsum4_range(arr)
+
+def maxsum2d(matrix):
+    """二维的最大子矩阵和，返回 (最大和, top, bottom, left, right)
+
+    最大子矩阵为 matrix[top:bottom] 的第left到right-1列，全部为负数时是 (0, 0, 0, 0, 0)。
+    枚举上下两条边，把中间各行按列相加后就是一维问题，O(n^2 m)。
+    有numpy时，对同一条上边，所有下边的列和用一次cumsum求出，
+    各行的Kadane也一起向量化；行数比列数多时先转置，复杂度为 O(min^2 max)，
+    这时相同最大和的几个子矩阵中选中的可能和纯Python版本不同。
+    """
+    if np is not None:
+        return _maxsum2d_numpy(matrix)
+    return _maxsum2d_loop(matrix)
+
+def _maxsum2d_loop(matrix):
+    best = (0, 0, 0, 0, 0)
+    rows = len(matrix)
+    cols = len(matrix[0]) if rows else 0
+    for top in range(rows):
+        col = [0] * cols
+        for bottom in range(top, rows):
+            row = matrix[bottom]
+            for c in range(cols):
+                col[c] += row[c]
+            s, left, right = maxsum4_range(col)
+            if s > best[0]:
+                best = (s, top, bottom + 1, left, right)
+    return best
+
+def _maxsum2d_numpy(matrix):
+    a = np.asarray(matrix)
+    if a.size == 0:
+        return 0, 0, 0, 0, 0
+    dtype = np.int64 if a.dtype.kind in 'biu' else np.float64
+    transposed = a.shape[0] > a.shape[1]
+    if transposed:
+        a = a.T
+    rows, cols = a.shape
+    best = (0, 0, 0, 0, 0)
+    for top in range(rows):
+        # col[r] 为第top到top+r行的列和，每一行再求一维前缀和
+        col = np.cumsum(a[top:], axis=0, dtype=dtype)
+        prefix = np.zeros((rows - top, cols + 1), dtype=dtype)
+        np.cumsum(col, axis=1, out=prefix[:, 1:])
+        gain = (prefix - np.minimum.accumulate(prefix, axis=1)).max(axis=1)
+        r = int(np.argmax(gain))
+        if gain[r] > best[0]:
+            s, left, right = maxsum_numpy(col[r])
+            best = (s, top, top + r + 1, left, right)
+    if transposed:
+        s, top, bottom, left, right = best
+        best = (s, left, right, top, bottom)
+    return best
+
+def maxsum_topk(arr, k):
+    """最多k个互不重叠的子数组，按和从大到小，返回 [(和, start, end), ...]
+
+    贪心：先取整个数组的最大子数组，它把数组分成左右两段，
+    两段各自的最大子数组放进堆里，每次取出和最大的那个再继续切分。
+    只返回和为正数的子数组。
+    """
+    result = []
+    heap = []
+
+    def push(lo, hi):
+        if lo < hi:
+            s, start, end = _maxsum_range(arr[lo:hi])
+            # 空区间切不开这一段，再放回堆里只会重复同一个结果
+            if s > 0 and start < end:
+                # 和相同时先取靠左的
+                heapq.heappush(heap, (-s, lo + start, lo + end, lo, hi))
+
+    push(0, len(arr))
+    while heap and len(result) < k:
+        s, start, end, lo, hi = heapq.heappop(heap)
+        result.append((-s, start, end))
+        push(lo, start)
+        push(end, hi)
+    return result
+
+
+if __name__ == '__main__':
+    # python maxsum.py [--max-n N] [--output maxsum.json] ...，参数见 benchmark.py
+    import benchmark
+    benchmark.main(['maxsum'] + sys.argv[1:])
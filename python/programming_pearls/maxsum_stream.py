@@ -0,0 +1,207 @@
+# -*- coding: UTF-8 -*-
+'''
+在线的最大子数组和：数据按批到来，每批用向量化的Kadane更新状态，
+内存只占一批，随时可以报告到目前为止的最大子数组和及其位置。
+
+# 文本，空白分隔的整数
+seq 1 100 | python maxsum_stream.py
+python maxsum_stream.py --float sensor.txt
+# 二进制数组文件，typecode 与 array 模块相同
+python maxsum_stream.py --binary d sensor.bin
+# 每处理100万个数输出一次当前结果
+tail -f sensor.log | python maxsum_stream.py --every 1000000 -
+
+输出 "最大和 start end 已处理个数"，最大子数组为第start到end-1个数（从0开始）。
+'''
+from __future__ import print_function
+
+import argparse
+import sys
+from array import array
+
+from maxsum import np
+
+
+# 每批的元素个数
+BATCH_ITEMS = 1 << 16
+# 文本每次读取的字节数
+TEXT_BLOCK = 1 << 20
+
+
+class StreamingMaxsum(object):
+    """maxsum4_range 的在线版本，结果（包括相同最大和时的取舍）与对全部数据调用
+    maxsum4_range 相同
+
+    状态只有几个数：已处理个数n、前缀和total、前缀和的最小值low和它最后一次出现的位置、
+    目前的最大和及其区间。以位置j结尾的最大子数组和为 prefix[j] - min(prefix[0..j])。
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.total = 0
+        self.low = 0
+        self.low_pos = 0
+        self.best = 0
+        self.start = 0
+        self.end = 0
+
+    def result(self):
+        return self.best, self.start, self.end
+
+    def update(self, batch):
+        """处理一批数，返回当前结果"""
+        if len(batch) == 0:
+            return self.result()
+        if np is None:
+            return self._update_loop(batch)
+        batch = np.asarray(batch)
+        dtype = np.int64 if batch.dtype.kind in 'biu' else np.float64
+        # ext[0] 是之前的最小前缀和，ext[i] 是前 n+i 个数的和
+        ext = np.empty(len(batch) + 1, dtype=dtype)
+        ext[0] = self.low
+        np.cumsum(batch, dtype=dtype, out=ext[1:])
+        ext[1:] += self.total
+        low = np.minimum.accumulate(ext)
+        gain = ext - low
+        i = int(np.argmax(gain[1:])) + 1
+        if gain[i] > self.best:
+            self.best = gain[i].item()
+            self.start = self._last_position(ext, i, low[i])
+            self.end = self.n + i
+        self.low_pos = self._last_position(ext, len(batch), low[-1])
+        self.low = low[-1].item()
+        self.total = ext[-1].item()
+        self.n += len(batch)
+        return self.result()
+
+    def _last_position(self, ext, i, value):
+        """ext[0..i] 中最后一个等于value的位置，换算成整个数据流中的前缀和下标"""
+        j = i - int(np.argmax(ext[i::-1] == value))
+        return self.low_pos if j == 0 else self.n + j
+
+    def _update_loop(self, batch):
+        total = self.total
+        for x in batch:
+            total += x
+            self.n += 1
+            if total <= self.low:
+                self.low = total
+                self.low_pos = self.n
+            elif total - self.low > self.best:
+                self.best = total - self.low
+                self.start, self.end = self.low_pos, self.n
+        self.total = total
+        return self.result()
+
+
+def _parse(tokens, number):
+    if np is not None:
+        return np.array(tokens).astype(np.float64 if number is float else np.int64)
+    return [number(t) for t in tokens]
+
+
+def read_text_batches(f, number=int, block_size=TEXT_BLOCK):
+    """从文本文件对象中按块读出空白分隔的数，每块转换成一批
+
+    块末尾可能截断了一个数，留到下一块再处理。管道上有 read1 时用 read1，
+    读到多少处理多少，不必等满一块。
+    """
+    read = getattr(f, 'read1', f.read)
+    rest = b''
+    while True:
+        data = read(block_size)
+        if not data:
+            break
+        data = rest + data
+        if data[-1:].isspace():
+            rest = b''
+        else:
+            # 最后一个数可能还没读完
+            pieces = data.rsplit(None, 1)
+            if len(pieces) == 2:
+                data, rest = pieces
+            else:
+                data, rest = b'', data
+        tokens = data.split()
+        if tokens:
+            yield _parse(tokens, number)
+    if rest.strip():
+        yield _parse(rest.split(), number)
+
+
+def read_binary_batches(f, typecode, batch_items=BATCH_ITEMS):
+    """从二进制文件对象中按批读出本机字节序的数组，typecode 与 array 模块相同"""
+    itemsize = array(typecode).itemsize
+    rest = b''
+    while True:
+        data = f.read(batch_items * itemsize)
+        if not data:
+            break
+        data = rest + data
+        usable = len(data) - len(data) % itemsize
+        data, rest = data[:usable], data[usable:]
+        if not data:
+            continue
+        if np is not None:
+            yield np.frombuffer(data, dtype=np.dtype(typecode))
+        else:
+            batch = array(typecode)
+            if hasattr(batch, 'frombytes'):
+                batch.frombytes(data)
+            else:
+                batch.fromstring(data)
+            yield batch
+    if rest:
+        raise ValueError('trailing %d bytes do not form a whole item' % len(rest))
+
+
+def maxsum_stream(batches):
+    """依次处理每一批，返回最终的 (最大和, start, end)"""
+    state = StreamingMaxsum()
+    for batch in batches:
+        state.update(batch)
+    return state.result()
+
+
+def _stdin_bytes():
+    return getattr(sys.stdin, 'buffer', sys.stdin)
+
+
+def _print_state(best, start, end, n):
+    print(best, start, end, n)
+    sys.stdout.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        usage='python %(prog)s [--float | --binary TYPECODE] [--every N] [file/-]')
+    parser.add_argument('source', nargs='?', default='-')
+    kind = parser.add_mutually_exclusive_group()
+    kind.add_argument('--float', action='store_true',
+                      help='text input contains floating point numbers')
+    kind.add_argument('-b', '--binary', metavar='TYPECODE',
+                      help='binary array input, TYPECODE as in the array module')
+    parser.add_argument('--every', type=int,
+                        help='print the running result every N numbers')
+    args = parser.parse_args(argv)
+
+    use_stdin = args.source == '-'
+    f = _stdin_bytes() if use_stdin else open(args.source, 'rb')
+    try:
+        if args.binary:
+            batches = read_binary_batches(f, args.binary)
+        else:
+            batches = read_text_batches(f, float if args.float else int)
+        state = StreamingMaxsum()
+        for batch in batches:
+            state.update(batch)
+            if args.every and state.n // args.every != (state.n - len(batch)) // args.every:
+                _print_state(state.best, state.start, state.end, state.n)
+        _print_state(state.best, state.start, state.end, state.n)
+    finally:
+        if not use_stdin:
+            f.close()
+
+
+if __name__ == '__main__':
+    main()
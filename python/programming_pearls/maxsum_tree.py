@@ -0,0 +1,105 @@
+# -*- coding: UTF-8 -*-
+'''
+支持单点修改的最大子数组和：线段树的每个结点保存这一段的四值概括
+(总和, 最大前缀和, 最大后缀和, 最大子数组和)，修改一个数只需要重算它到根的
+O(log n) 个结点，任意区间的查询也只合并 O(log n) 个结点。
+
+    >>> tree = MaxsumTree([31, -41, 59, 26, -53, 58, 97, -93, -23, 84])
+    >>> tree.query()
+    187
+    >>> tree.update(4, 100)
+    >>> tree.query(2, 6)
+    340
+'''
+from maxsum import EMPTY_SUMMARY, combine
+
+
+class MaxsumTree(object):
+    """自底向上的线段树，四个值分别存在四个平铺的列表里，不建结点对象
+
+    叶子个数取不小于n的2的幂，结点k的孩子是2k和2k+1，叶子i在 size+i，
+    多出来的叶子是空数组的概括 (0, 0, 0, 0)，它是合并的单位元。
+    """
+
+    def __init__(self, arr):
+        n = len(arr)
+        size = 1
+        while size < n:
+            size <<= 1
+        self.n = n
+        self.size = size
+        self.total = [0] * (2 * size)
+        self.prefix = [0] * (2 * size)
+        self.suffix = [0] * (2 * size)
+        self.best = [0] * (2 * size)
+        for i in range(n):
+            self._set_leaf(size + i, arr[i])
+        for k in reversed(range(1, size)):
+            self._pull(k)
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        return self.total[self.size + self._index(i)]
+
+    def _index(self, i):
+        if i < 0:
+            i += self.n
+        if not 0 <= i < self.n:
+            raise IndexError('index out of range')
+        return i
+
+    def _set_leaf(self, k, value):
+        self.total[k] = value
+        self.prefix[k] = self.suffix[k] = self.best[k] = max(value, 0)
+
+    def _node(self, k):
+        return self.total[k], self.prefix[k], self.suffix[k], self.best[k]
+
+    def _pull(self, k):
+        left, right = 2 * k, 2 * k + 1
+        total, prefix, suffix, best = self.total, self.prefix, self.suffix, self.best
+        total[k] = total[left] + total[right]
+        prefix[k] = max(prefix[left], total[left] + prefix[right])
+        suffix[k] = max(suffix[right], total[right] + suffix[left])
+        best[k] = max(best[left], best[right], suffix[left] + prefix[right])
+
+    def update(self, i, value):
+        """把第i个数改为value，O(log n)"""
+        k = self.size + self._index(i)
+        self._set_leaf(k, value)
+        k >>= 1
+        while k:
+            self._pull(k)
+            k >>= 1
+
+    def summary(self, l=0, r=None):
+        """第l到第r个数（包括r）的四值概括，O(log n)"""
+        if r is None:
+            r = self.n - 1
+        if self.n == 0:
+            return EMPTY_SUMMARY
+        # 负下标先换算成正的，再判断区间是否为空
+        l = self._index(l)
+        r = self._index(r)
+        if l > r:
+            return EMPTY_SUMMARY
+        lo = self.size + l
+        hi = self.size + r + 1
+        # 合并不满足交换律，左右两边分别从外向里累积
+        left = right = EMPTY_SUMMARY
+        while lo < hi:
+            if lo & 1:
+                left = combine(left, self._node(lo))
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                right = combine(self._node(hi), right)
+            lo >>= 1
+            hi >>= 1
+        return combine(left, right)
+
+    def query(self, l=0, r=None):
+        """arr[l..r]（包括r）的最大子数组和，默认整个数组"""
+        return self.summary(l, r)[3]
@@ -1,9 +1,24 @@
+# -*- coding: UTF-8 -*-
+from __future__ import print_function
+
 import sys
 
-last_token = None
-for line in sys.stdin:
-    token, word = line.strip().split()
-    if last_token and last_token != token:
-        print
-    print word,
-    last_token = token
\ No newline at end of file
+
+def group_sorted(pairs):
+    """把按token排好序的 (token, word) 按token分组，依次返回每组的单词列表"""
+    last_token = None
+    words = []
+    for token, word in pairs:
+        if words and last_token != token:
+            yield words
+            words = []
+        words.append(word)
+        last_token = token
+    if words:
+        yield words
+
+
+if __name__ == '__main__':
+    pairs = (line.strip().split() for line in sys.stdin)
+    for words in group_sorted(pairs):
+        print(' '.join(words))
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+'''
+anagram.py 的单元测试
+python -m unittest test_anagram
+'''
+import io
+import os
+import random
+import subprocess
+import sys
+import unittest
+
+import anagram
+from anagram import (
+    anagram_classes,
+    anagram_classes_external,
+    anagram_classes_parallel,
+    block_signatures,
+    count_signature,
+    group_anagrams,
+    parse_size,
+    prime_signature,
+    read_blocks,
+    read_words,
+    signature,
+    SIGNATURES,
+    write_classes,
+    )
+from reduce import group_sorted
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def pipeline(words):
+    """在进程内模拟 token.py | LC_ALL=C sort | reduce.py"""
+    lines = sorted(signature(word) + b' ' + word for word in words)
+    return list(group_sorted(line.split() for line in lines))
+
+
+def random_words(count, seed=0):
+    rng = random.Random(seed)
+    words = []
+    while len(words) < count:
+        base = bytearray(rng.choice(b'abcde') for _ in range(rng.randint(1, 5)))
+        for _ in range(rng.randint(1, 3)):
+            rng.shuffle(base)
+            words.append(bytes(base))
+    return words
+
+
+class AnagramTest(unittest.TestCase):
+
+    def test_signature(self):
+        self.assertEqual(signature(b'pots'), b'opst')
+        self.assertEqual(signature(b'stop'), signature(b'tops'))
+
+    def test_count_prime_signatures(self):
+        self.assertEqual(count_signature(b'stop'), count_signature(b'pots'))
+        self.assertEqual(count_signature(b'aab'), b'\x02\x01' + b'\x00' * 24)
+        self.assertEqual(prime_signature(b'aab'), 2 * 2 * 3)
+        self.assertNotEqual(prime_signature(b'ab'), prime_signature(b'aab'))
+        # 不全是小写字母的单词、乘积太大的单词用排序签名
+        self.assertEqual(count_signature(b'Tops'), b'\xffTops')
+        self.assertEqual(prime_signature(b'b-a'), b'-ab')
+        self.assertEqual(prime_signature(b'z' * 10), b'z' * 10)
+        self.assertEqual(prime_signature(b'z' * 9), 101 ** 9)
+
+    def test_block_signatures(self):
+        rng = random.Random(3)
+        lines = []
+        for _ in range(2000):
+            alphabet = rng.choice([b'abc', b'xyz', b'aB c\t1\xe9'])
+            size = rng.choice([0, 1, 5, 9, 12, 31, 32, 33, 300])
+            lines.append(bytes(bytearray(rng.choice(bytearray(alphabet)) for _ in range(size))))
+        data = b'\n'.join(lines)
+        expected = sorted(read_words(io.BytesIO(data)))
+        for key in SIGNATURES.values():
+            for block in (data, data + b'\n', b'', b'\n \n', b'ab'):
+                keys, words = block_signatures(block, key)
+                self.assertEqual(keys, [key(word) for word in words])
+                self.assertEqual(sorted(words), sorted(read_words(io.BytesIO(block))))
+            self.assertEqual(sorted(block_signatures(data, key)[1]), expected)
+
+    def test_group(self):
+        groups = group_anagrams([b'pans', b'pots', b'snap', b'opt'])
+        self.assertEqual(groups, {b'anps': [b'pans', b'snap'], b'opst': [b'pots'], b'opt': [b'opt']})
+
+    def test_same_as_pipeline(self):
+        for seed in range(5):
+            words = random_words(300, seed)
+            self.assertEqual(anagram_classes(words), pipeline(words))
+            for key in SIGNATURES.values():
+                self.assertEqual(anagram_classes(words, key), pipeline(words))
+
+    def test_prefix_signatures(self):
+        # 签名 ab 是 abc 的前缀，sort 比较的是 "ab ba" 和 "abc cab"
+        words = [b'cab', b'ba', b'ab', b'abc']
+        self.assertEqual(anagram_classes(words), [[b'ab', b'ba'], [b'abc', b'cab']])
+        self.assertEqual(anagram_classes(words), pipeline(words))
+
+    def test_read_write(self):
+        words = list(read_words(io.BytesIO(b'pans\r\n\npots \nsnap\n')))
+        self.assertEqual(words, [b'pans', b'pots', b'snap'])
+        out = io.BytesIO()
+        write_classes(anagram_classes(words), out)
+        self.assertEqual(out.getvalue(), b'pans snap\npots\n')
+
+    def test_read_blocks(self):
+        data = b'pans\npots\nopt\nmope\nsnap'
+        for block_size in (1, 3, 7, 100):
+            blocks = list(read_blocks(io.BytesIO(data), block_size))
+            self.assertEqual(b''.join(blocks), data)
+            for block in blocks[:-1]:
+                self.assertTrue(block.endswith(b'\n'))
+
+    def test_parallel(self):
+        words = random_words(2000, 7)
+        data = b'\n'.join(words) + b'\n'
+        expected = anagram_classes(words)
+        for workers, partitions, block_size in ((2, 3, 500), (1, 1, 64), (3, 2, 1 << 20)):
+            blocks = read_blocks(io.BytesIO(data), block_size)
+            self.assertEqual(anagram_classes_parallel(blocks, workers, partitions), expected)
+        for key in SIGNATURES.values():
+            blocks = read_blocks(io.BytesIO(data), 1000)
+            self.assertEqual(anagram_classes_parallel(blocks, 2, 3, key), expected)
+        self.assertEqual(anagram_classes_parallel(iter([]), 2), [])
+        # 单词中间有空格时签名以空格开头
+        words = [b'a b', b'ba ', b'b a', b'x']
+        data = b'\n'.join(words)
+        self.assertEqual(anagram_classes_parallel(read_blocks(io.BytesIO(data)), 2, 2),
+                         anagram_classes(list(read_words(io.BytesIO(data)))))
+
+    def test_external(self):
+        words = random_words(3000, 8)
+        expected = anagram_classes(words)
+        # 只放得下几十个单词，会写上百个临时文件，需要分轮归并
+        fan_in = anagram.MERGE_FAN_IN
+        anagram.MERGE_FAN_IN = 4
+        try:
+            for memory in (1 << 30, 20000, 4000):
+                self.assertEqual(list(anagram_classes_external(words, memory)), expected)
+        finally:
+            anagram.MERGE_FAN_IN = fan_in
+
+    def test_external_other_signatures(self):
+        # 外部排序只用排序签名，结果与用计数、质数签名分组的 anagram_classes 相同
+        words = [b'zz', b'ba', b'c', b'a', b'ab', b'Ab', b'bA'] + random_words(500, 9)
+        for memory in (1 << 30, 2000):
+            external = list(anagram_classes_external(words, memory))
+            self.assertEqual(external, anagram_classes(words, count_signature))
+            self.assertEqual(external, anagram_classes(words, prime_signature))
+
+    def test_external_removes_runs(self):
+        import tempfile
+        directory = tempfile.mkdtemp()
+        try:
+            classes = anagram_classes_external(random_words(500), 2000, directory=directory)
+            next(classes)
+            self.assertEqual(len(os.listdir(directory)), 1)
+            classes.close()
+            self.assertEqual(os.listdir(directory), [])
+        finally:
+            os.rmdir(directory)
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size('512M'), 512 << 20)
+        self.assertEqual(parse_size('1.5k'), 1536)
+        self.assertEqual(parse_size('2GB'), 2 << 30)
+        self.assertEqual(parse_size('1000'), 1000)
+
+    def test_shell_pipeline(self):
+        word_file = os.path.join(HERE, 'word.txt')
+        env = dict(os.environ, LC_ALL='C')
+        python = '"%s"' % sys.executable
+        expected = subprocess.check_output(
+            '%s token.py < word.txt | sort | %s reduce.py' % (python, python),
+            shell=True, cwd=HERE, env=env)
+        output = subprocess.check_output([sys.executable, 'anagram.py', word_file], cwd=HERE)
+        self.assertEqual(output, expected)
+        self.assertEqual(output, b'pans snap\nmope poem\npots stop tops\nopt\n')
+        for options in (['-j', '2'], ['--memory', '200'], ['--signature', 'count'],
+                        ['-j', '2', '--signature', 'prime']):
+            output = subprocess.check_output([sys.executable, 'anagram.py'] + options + [word_file],
+                                             cwd=HERE)
+            self.assertEqual(output, expected)
+        # 其他签名分组相同，只是各组的顺序不同
+        for name in ('count', 'prime'):
+            output = subprocess.check_output(
+                '%s token.py --signature %s < word.txt | sort | %s reduce.py'
+                % (python, name, python),
+                shell=True, cwd=HERE, env=env)
+            self.assertEqual(sorted(output.splitlines()), sorted(expected.splitlines()))
+
+
+if __name__ == '__main__':
+    unittest.main()
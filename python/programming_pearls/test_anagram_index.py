@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+'''
+anagram_index.py 的单元测试
+python -m unittest test_anagram_index
+'''
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from anagram import anagram_classes, anagram_classes_external
+from anagram_index import AnagramIndex, build_index
+from test_anagram import random_words
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+class AnagramIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.prefix = os.path.join(self.directory, 'words.idx')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_lookup(self):
+        words = random_words(2000, 5)
+        classes = anagram_classes(words)
+        self.assertEqual(build_index(classes, self.prefix), len(classes))
+        with AnagramIndex(self.prefix) as index:
+            self.assertEqual(len(index), len(classes))
+            for i, group in enumerate(classes):
+                self.assertEqual(index.words(i), group)
+                for word in group:
+                    self.assertEqual(index.lookup(word), group)
+            self.assertEqual(index.lookup(b'zzzzzz'), [])
+            self.assertEqual(index.find(b''), -1)
+
+    def test_prefix_signatures(self):
+        # 签名 ab 是 abc 的前缀，a b 以空格开头，排在前面
+        words = [b'cab', b'ba', b'ab', b'abc', b'b a', b'a']
+        build_index(anagram_classes(words), self.prefix)
+        with AnagramIndex(self.prefix) as index:
+            self.assertEqual(index.lookup(b'ba'), [b'ab', b'ba'])
+            self.assertEqual(index.lookup(b'bca'), [b'abc', b'cab'])
+            self.assertEqual(index.lookup(b'a'), [b'a'])
+            self.assertEqual(index.lookup(b'ab '), [b'ab', b'ba'])
+            self.assertEqual(index.lookup(b' ab'), [b'ab', b'ba'])
+            self.assertEqual(index.lookup(b'a b'), [b'b a'])
+            self.assertEqual(index.lookup(b'b'), [])
+
+    def test_external_and_empty(self):
+        words = random_words(1000, 6)
+        build_index(anagram_classes_external(words, 4000), self.prefix)
+        expected = [group for group in anagram_classes(words) if words[0] in group][0]
+        with AnagramIndex(self.prefix) as index:
+            self.assertEqual(index.lookup(words[0]), expected)
+        build_index([], self.prefix)
+        with AnagramIndex(self.prefix) as index:
+            self.assertEqual(len(index), 0)
+            self.assertEqual(index.lookup(b'pots'), [])
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, build_index, [[b'pots'], [b'pans']], self.prefix)
+        build_index([[b'pans'], [b'pots']], self.prefix)
+        with open(self.prefix + '.table', 'ab') as f:
+            f.write(b'x')
+        self.assertRaises(ValueError, AnagramIndex, self.prefix)
+
+    def test_command_line(self):
+        word_file = os.path.join(HERE, 'word.txt')
+        # build 与 anagram.py 共用读入和分组的参数
+        for options in ([], ['-j', '2', '--signature', 'count'], ['--memory', '200']):
+            subprocess.check_call([sys.executable, 'anagram_index.py', 'build'] + options +
+                                  [self.prefix, word_file], cwd=HERE, stderr=subprocess.PIPE)
+            output = subprocess.check_output(
+                [sys.executable, 'anagram_index.py', 'query', self.prefix, 'stop', 'xyz', 'pnas'],
+                cwd=HERE)
+            self.assertEqual(output, b'pots stop tops\n\npans snap\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
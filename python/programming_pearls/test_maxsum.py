@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+'''
+maxsum.py 的单元测试
+python -m unittest test_maxsum
+'''
+import os
+import random
+import tempfile
+import unittest
+from array import array
+from functools import reduce
+
+import maxsum
+from maxsum import (
+    EMPTY_SUMMARY,
+    EXAMPLE,
+    combine,
+    maxsum1,
+    maxsum2,
+    maxsum3,
+    maxsum4,
+    maxsum2d,
+    maxsum4_range,
+    maxsum_numpy,
+    maxsum_parallel,
+    maxsum_parallel_file,
+    maxsum_topk,
+    summarize,
+    )
+
+
+def random_arrays(count=200, seed=0):
+    rng = random.Random(seed)
+    yield []
+    yield [-1, -2, -3]
+    yield [0, 0, 0]
+    yield [5, -5, 5]
+    for _ in range(count):
+        n = rng.randint(1, 40)
+        yield [rng.randint(-20, 20) for _ in range(n)]
+
+
+class MaxsumTest(unittest.TestCase):
+
+    def test_example(self):
+        for func in (maxsum1, maxsum2, maxsum3, maxsum4):
+            self.assertEqual(func(EXAMPLE), 187)
+        self.assertEqual(maxsum4_range(EXAMPLE), (187, 2, 7))
+
+    def test_algorithms_agree(self):
+        for arr in random_arrays():
+            expected = maxsum4(arr)
+            self.assertEqual(maxsum1(arr), expected)
+            self.assertEqual(maxsum2(arr), expected)
+            self.assertEqual(maxsum3(arr), expected)
+            best, start, end = maxsum4_range(arr)
+            self.assertEqual(best, expected)
+            self.assertEqual(sum(arr[start:end]), best)
+
+    def test_range_ties(self):
+        # 和相同时取结束位置最小、最短的
+        self.assertEqual(maxsum4_range([5, -5, 5]), (5, 0, 1))
+        self.assertEqual(maxsum4_range([-1, 0, 3]), (3, 2, 3))
+        self.assertEqual(maxsum4_range([-1, -2]), (0, 0, 0))
+
+
+class SummaryTest(unittest.TestCase):
+
+    def test_summarize(self):
+        self.assertEqual(summarize([]), EMPTY_SUMMARY)
+        self.assertEqual(summarize([3, -5, 4, -1]), (1, 3, 3, 4))
+        self.assertEqual(summarize([-2, -3]), (-5, 0, 0, 0))
+
+    def test_combine_any_split(self):
+        rng = random.Random(2)
+        for arr in random_arrays(50):
+            whole = summarize(arr)
+            self.assertEqual(whole[3], maxsum4(arr))
+            cuts = sorted(rng.randint(0, len(arr)) for _ in range(3))
+            bounds = [0] + cuts + [len(arr)]
+            pieces = [summarize(arr[a:b]) for a, b in zip(bounds, bounds[1:])]
+            self.assertEqual(reduce(combine, pieces, EMPTY_SUMMARY), whole)
+
+    def test_pure_python(self):
+        np = maxsum.np
+        maxsum.np = None
+        try:
+            for arr in random_arrays(50):
+                self.assertEqual(summarize(arr)[3], maxsum4(arr))
+        finally:
+            maxsum.np = np
+
+
+class MaxsumParallelTest(unittest.TestCase):
+
+    def test_parallel(self):
+        rng = random.Random(3)
+        arr = [rng.randint(-100, 100) for _ in range(5000)]
+        self.assertEqual(maxsum_parallel(arr, 2), maxsum4(arr))
+        self.assertEqual(maxsum_parallel(arr, 1), maxsum4(arr))
+        self.assertEqual(maxsum_parallel([], 2), 0)
+        self.assertEqual(maxsum_parallel(EXAMPLE, 3), 187)
+
+    def test_parallel_file(self):
+        rng = random.Random(4)
+        values = array('i', [rng.randint(-100, 100) for _ in range(3001)])
+        fd, path = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                values.tofile(f)
+            block_items = maxsum.BLOCK_ITEMS
+            maxsum.BLOCK_ITEMS = 100
+            try:
+                self.assertEqual(maxsum_parallel_file(path, 'i', 2), maxsum4(values))
+                self.assertEqual(maxsum_parallel_file(path, 'i', 1), maxsum4(values))
+            finally:
+                maxsum.BLOCK_ITEMS = block_items
+        finally:
+            os.remove(path)
+
+
+def brute_force_2d(matrix):
+    rows = len(matrix)
+    cols = len(matrix[0]) if rows else 0
+    best = 0
+    for top in range(rows):
+        for bottom in range(top + 1, rows + 1):
+            for left in range(cols):
+                for right in range(left + 1, cols + 1):
+                    best = max(best, rect_sum(matrix, top, bottom, left, right))
+    return best
+
+
+def rect_sum(matrix, top, bottom, left, right):
+    return sum(sum(row[left:right]) for row in matrix[top:bottom])
+
+
+class Maxsum2dTest(unittest.TestCase):
+
+    def check(self, matrix):
+        for np in (maxsum.np, None):
+            saved = maxsum.np
+            maxsum.np = np
+            try:
+                s, top, bottom, left, right = maxsum2d(matrix)
+            finally:
+                maxsum.np = saved
+            self.assertEqual(s, brute_force_2d(matrix))
+            self.assertEqual(rect_sum(matrix, top, bottom, left, right), s)
+
+    def test_random(self):
+        rng = random.Random(5)
+        for _ in range(30):
+            rows = rng.randint(1, 6)
+            cols = rng.randint(1, 6)
+            self.check([[rng.randint(-9, 9) for _ in range(cols)] for _ in range(rows)])
+
+    def test_edge_cases(self):
+        self.assertEqual(maxsum2d([]), (0, 0, 0, 0, 0))
+        self.assertEqual(maxsum2d([[-1, -2], [-3, -4]]), (0, 0, 0, 0, 0))
+        self.assertEqual(maxsum2d([[0, -2, -7, 0],
+                                   [9, 2, -6, 2],
+                                   [-4, 1, -4, 1],
+                                   [-1, 8, 0, -2]]), (15, 1, 4, 0, 2))
+        self.check([[1, 2, 3]])
+        self.check([[1], [-2], [3]])
+
+    def test_float(self):
+        arr = [-0.1, 0.7, 0.1, 1.1, -0.3, 0.1, 0.3, 0.2, 0.7]
+        s, top, bottom, left, right = maxsum2d([arr, arr])
+        self.assertEqual((top, bottom, left, right), (0, 2, 1, 9))
+        self.assertAlmostEqual(s, 5.8)
+
+
+class MaxsumTopkTest(unittest.TestCase):
+
+    def test_example(self):
+        self.assertEqual(maxsum_topk(EXAMPLE, 3), [(187, 2, 7), (84, 9, 10), (31, 0, 1)])
+        self.assertEqual(maxsum_topk(EXAMPLE, 1), [(187, 2, 7)])
+        self.assertEqual(maxsum_topk([-1, -2], 3), [])
+
+    def test_float(self):
+        arr = [-0.1, 0.7, 0.1, 1.1, -0.3, 0.1, 0.3, 0.2, 0.7]
+        result = maxsum_topk(arr, 3)
+        self.assertEqual([(start, end) for _, start, end in result], [(1, 9)])
+        self.assertAlmostEqual(result[0][0], 2.9)
+        rng = random.Random(7)
+        for _ in range(200):
+            arr = [rng.choice((0.1, -0.3, 0.7, -0.2)) for _ in range(rng.randint(1, 30))]
+            covered = set()
+            for s, start, end in maxsum_topk(arr, 4):
+                self.assertTrue(start < end)
+                self.assertAlmostEqual(sum(arr[start:end]), s)
+                self.assertTrue(covered.isdisjoint(range(start, end)))
+                covered.update(range(start, end))
+
+    def test_disjoint_and_sorted(self):
+        rng = random.Random(6)
+        for _ in range(50):
+            arr = [rng.randint(-10, 10) for _ in range(rng.randint(0, 40))]
+            result = maxsum_topk(arr, 5)
+            self.assertTrue(len(result) <= 5)
+            sums = [s for s, _, _ in result]
+            self.assertEqual(sums, sorted(sums, reverse=True))
+            covered = set()
+            for s, start, end in result:
+                self.assertEqual(sum(arr[start:end]), s)
+                self.assertTrue(covered.isdisjoint(range(start, end)))
+                covered.update(range(start, end))
+            if result:
+                self.assertEqual(result[0][0], maxsum4(arr))
+
+
+@unittest.skipIf(maxsum.np is None, 'numpy is not installed')
+class MaxsumNumpyTest(unittest.TestCase):
+
+    def test_matches_maxsum4(self):
+        for arr in random_arrays():
+            self.assertEqual(maxsum_numpy(arr), maxsum4_range(arr))
+            self.assertEqual(maxsum_numpy(maxsum.np.array(arr, dtype=maxsum.np.int32)),
+                             maxsum4_range(arr))
+
+    def test_large(self):
+        np = maxsum.np
+        rng = np.random.RandomState(1)
+        arr = rng.randint(-100, 101, size=100000)
+        self.assertEqual(maxsum_numpy(arr), maxsum4_range(arr.tolist()))
+
+    def test_float(self):
+        best, start, end = maxsum_numpy([1.5, -3.0, 2.25, 0.5])
+        self.assertEqual((best, start, end), (2.75, 2, 4))
+
+    def test_float_not_dyadic(self):
+        # 0.1、0.7 这样的数不能精确表示，前缀和相减之后不一定等于原来的最小值
+        arr = [-0.1, 0.7, 0.1, 1.1, -0.3, 0.1, 0.3, 0.2, 0.7]
+        best, start, end = maxsum_numpy(arr)
+        self.assertEqual((start, end), (1, 9))
+        self.assertAlmostEqual(best, 2.9)
+        rng = random.Random(4)
+        for _ in range(500):
+            arr = [rng.choice((0.1, -0.3, 0.7, -0.2, 1.1)) for _ in range(rng.randint(1, 30))]
+            best, start, end = maxsum_numpy(arr)
+            if best > 0:
+                self.assertTrue(start < end)
+                self.assertAlmostEqual(sum(arr[start:end]), best)
+            self.assertAlmostEqual(best, maxsum4_range(arr)[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
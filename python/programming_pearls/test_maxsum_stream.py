@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+'''
+maxsum_stream.py 的单元测试
+python -m unittest test_maxsum_stream
+'''
+import io
+import random
+import sys
+import unittest
+from array import array
+
+import maxsum_stream
+from maxsum import maxsum4_range
+from maxsum_stream import (
+    StreamingMaxsum,
+    main,
+    maxsum_stream as run_stream,
+    read_binary_batches,
+    read_text_batches,
+    )
+
+
+def batches_of(arr, size):
+    return [arr[i:i + size] for i in range(0, len(arr), size)]
+
+
+class StreamingMaxsumTest(unittest.TestCase):
+
+    def check(self, arr):
+        expected = maxsum4_range(arr)
+        for size in (1, 2, 3, 7, 50):
+            self.assertEqual(run_stream(batches_of(arr, size)), expected)
+
+    def test_random(self):
+        rng = random.Random(0)
+        for _ in range(100):
+            self.check([rng.randint(-10, 10) for _ in range(rng.randint(0, 60))])
+
+    def test_ties(self):
+        self.check([5, -5, 5])
+        self.check([-1, 0, 3])
+        self.check([0, 0, 0])
+        self.check([-3, 3, -3, 3, -1, 1])
+
+    def test_running_result(self):
+        state = StreamingMaxsum()
+        self.assertEqual(state.update([31, -41, 59]), (59, 2, 3))
+        self.assertEqual(state.update([26, -53, 58, 97]), (187, 2, 7))
+        self.assertEqual(state.update([-93, -23, 84]), (187, 2, 7))
+        self.assertEqual(state.n, 10)
+
+    def test_pure_python(self):
+        np = maxsum_stream.np
+        maxsum_stream.np = None
+        try:
+            rng = random.Random(1)
+            for _ in range(50):
+                self.check([rng.randint(-10, 10) for _ in range(rng.randint(0, 40))])
+        finally:
+            maxsum_stream.np = np
+
+
+class ReaderTest(unittest.TestCase):
+
+    def test_text_split_numbers(self):
+        data = b'31 -41 59\n26 -53\t58 97\n-93 -23 84'
+        for block_size in (1, 2, 5, 100):
+            values = []
+            for batch in read_text_batches(io.BytesIO(data), int, block_size):
+                values.extend(int(x) for x in batch)
+            self.assertEqual(values, [31, -41, 59, 26, -53, 58, 97, -93, -23, 84])
+
+    def test_text_float(self):
+        batches = list(read_text_batches(io.BytesIO(b'1.5 -3 2.25 0.5\n'), float))
+        self.assertEqual(run_stream(batches), (2.75, 2, 4))
+
+    def test_binary(self):
+        values = array('i', [31, -41, 59, 26, -53, 58, 97, -93, -23, 84])
+        data = values.tostring() if not hasattr(values, 'tobytes') else values.tobytes()
+        batches = read_binary_batches(io.BytesIO(data), 'i', 3)
+        self.assertEqual(run_stream(batches), (187, 2, 7))
+        with self.assertRaises(ValueError):
+            list(read_binary_batches(io.BytesIO(data + b'\x00'), 'i', 3))
+
+
+class MainTest(unittest.TestCase):
+
+    def test_main(self):
+        f = io.BytesIO(b'31 -41 59 26 -53 58 97 -93 -23 84\n')
+        stdin, stdout = sys.stdin, sys.stdout
+        sys.stdin = f
+        sys.stdout = out = io.BytesIO() if sys.version_info[0] < 3 else io.StringIO()
+        try:
+            main(['-'])
+        finally:
+            sys.stdin, sys.stdout = stdin, stdout
+        self.assertEqual(out.getvalue().strip(), '187 2 7 10')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+'''
+maxsum_tree.py 的单元测试
+python -m unittest test_maxsum_tree
+'''
+import random
+import unittest
+
+from maxsum import EXAMPLE, maxsum4, summarize
+from maxsum_tree import MaxsumTree
+
+
+class MaxsumTreeTest(unittest.TestCase):
+
+    def test_example(self):
+        tree = MaxsumTree(EXAMPLE)
+        self.assertEqual(len(tree), 10)
+        self.assertEqual(tree.query(), 187)
+        self.assertEqual(tree.query(0, 1), 31)
+        self.assertEqual(tree.query(7, 8), 0)
+        tree.update(4, 100)
+        self.assertEqual(tree[4], 100)
+        self.assertEqual(tree.query(2, 6), 340)
+
+    def test_negative_indices(self):
+        tree = MaxsumTree([1, 2, 3])
+        self.assertEqual(tree.query(1, -1), 5)
+        self.assertEqual(tree.query(-3, -2), 3)
+        self.assertEqual(tree.query(-1, 0), 0)
+        self.assertRaises(IndexError, tree.query, 0, 3)
+
+    def test_empty(self):
+        tree = MaxsumTree([])
+        self.assertEqual(tree.query(), 0)
+        self.assertRaises(IndexError, tree.update, 0, 1)
+
+    def test_random_updates_and_queries(self):
+        rng = random.Random(0)
+        for n in (1, 2, 3, 5, 16, 17, 40):
+            arr = [rng.randint(-20, 20) for _ in range(n)]
+            tree = MaxsumTree(arr)
+            for _ in range(100):
+                i = rng.randrange(n)
+                arr[i] = rng.randint(-20, 20)
+                tree.update(i, arr[i])
+                l = rng.randrange(n)
+                r = rng.randrange(l, n)
+                self.assertEqual(tree.query(l, r), maxsum4(arr[l:r + 1]))
+                self.assertEqual(tree.summary(l, r), summarize(arr[l:r + 1]))
+            self.assertEqual(tree.query(), maxsum4(arr))
+
+
+if __name__ == '__main__':
+    unittest.main()
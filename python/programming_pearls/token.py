@@ -1,9 +1,61 @@
-
-
-#
+# -*- coding: UTF-8 -*-
 #cat t.txt|python token.py | sort | python reduce.py
+#python anagram.py t.txt  和上面的管道输出相同，不需要sort和两个进程之间的文本传递
+#cat t.txt|python token.py --signature count | sort | python reduce.py
+#  字母计数签名（a1e1l1p2）或质数乘积签名，分组相同，但各组的先后顺序与排序签名不同
+from __future__ import print_function
 
+import argparse
+import os
 import sys
 
-for line in sys.stdin:
-    print ''.join(sorted(line.rstrip())), line,
\ No newline at end of file
+
+def _count_text(k):
+    # 26个字母的计数写成 a1e1l1p2，计数签名以外的是 b'\xff' 加上排序签名
+    if k[:1] == b'\xff':
+        return k[1:]
+    return b''.join(('%c%d' % (97 + i, n)).encode('ascii')
+                    for i, n in enumerate(bytearray(k)) if n)
+
+
+def _prime_text(k):
+    # 乘积后面加 #，排好序的单词里 # 不会出现在数字后面，两种签名不会相同
+    if isinstance(k, bytes):
+        return k
+    return ('%d#' % k).encode('ascii')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(usage='python %(prog)s [--signature sort|count|prime]')
+    parser.add_argument('--signature', choices=('sort', 'count', 'prime'), default='sort',
+                        help='sorted letters (default), letter counts or a product of primes; '
+                             'the groups are the same, their order after sort is not')
+    args = parser.parse_args(argv)
+    if args.signature == 'sort':
+        for line in sys.stdin:
+            print(''.join(sorted(line.rstrip())), line, end='')
+        return
+
+    from anagram import SIGNATURES
+    key = SIGNATURES[args.signature]
+    text = _count_text if args.signature == 'count' else _prime_text
+    out = getattr(sys.stdout, 'buffer', sys.stdout)
+    for line in getattr(sys.stdin, 'buffer', sys.stdin):
+        out.write(text(key(line.rstrip())) + b' ' + line)
+
+
+def _load_stdlib_token():
+    # 在本目录下运行的脚本会把这个目录放在sys.path最前面，标准库tokenize
+    # （numpy、inspect等都会用到）的 from token import * 导入的是这个文件，
+    # 这时执行标准库的token.py，让这个模块的内容和标准库的一样
+    import sysconfig
+    path = os.path.join(sysconfig.get_paths()['stdlib'], 'token.py')
+    with open(path) as f:
+        code = compile(f.read(), path, 'exec', 0, True)
+    exec(code, globals())
+
+
+if __name__ == '__main__':
+    main()
+else:
+    _load_stdlib_token()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import argparse
+import os
+from array import array
+from collections import deque
+
+from search import _blocks, _stdin_bytes, _stream_blocks, _to_bytes, mapped_file, read_chunks
+
+
+# 多个搜索词一次扫描全部找出，和 search.py 的命令行用法一致
+# python aho_corasick.py ERROR /var/log/messages
+# python aho_corasick.py -e ERROR -e WARN --count /var/log/messages
+# python aho_corasick.py -f rules.txt --all /var/log/messages
+# cat /var/log/messages | python aho_corasick.py -f rules.txt -
+
+# https://en.wikipedia.org/wiki/Aho%E2%80%93Corasick_algorithm
+
+
+class AhoCorasick(object):
+    """多模式匹配自动机
+
+    先建一棵字典树，再按层次遍历补全失败转移，最后得到一个确定的自动机。
+    转移表是一个平铺的整数数组：delta[(state << 8) | byte] 为下一个状态，
+    扫描时每个字节只查一次表，不需要沿失败指针回退。
+    """
+
+    def __init__(self, patterns):
+        self.patterns = [_to_bytes(p) for p in patterns]
+        if not self.patterns:
+            raise ValueError('at least one search string is required')
+        if not all(self.patterns):
+            raise ValueError('empty search string')
+        self.lengths = [len(p) for p in self.patterns]
+
+        # 字典树
+        goto = [{}]
+        out = [[]]
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for c in bytearray(pattern):
+                nxt = goto[state].get(c)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto.append({})
+                    out.append([])
+                    goto[state][c] = nxt
+                state = nxt
+            out[state].append(index)
+
+        # 按层次遍历，失败状态总是比当前状态浅，它那一行转移已经补全，
+        # 直接复制过来再用字典树上的边覆盖即可
+        delta = array('i', [0]) * (len(goto) << 8)
+        fail = [0] * len(goto)
+        queue = deque()
+        for c, state in goto[0].items():
+            delta[c] = state
+            queue.append(state)
+        while queue:
+            r = queue.popleft()
+            base_r = r << 8
+            base_f = fail[r] << 8
+            delta[base_r:base_r + 256] = delta[base_f:base_f + 256]
+            out[r].extend(out[fail[r]])
+            for c, state in goto[r].items():
+                fail[state] = delta[base_f + c]
+                delta[base_r + c] = state
+                queue.append(state)
+
+        self.delta = delta
+        self.out = [tuple(o) for o in out]
+        self.states = len(goto)
+
+    def _scan(self, blocks):
+        """依次扫描 (偏移, bytearray) 块，自动机状态跨块保留"""
+        delta = self.delta
+        out = self.out
+        lengths = self.lengths
+        state = 0
+        for base, block in blocks:
+            for i, c in enumerate(block, base + 1):
+                state = delta[(state << 8) | c]
+                if out[state]:
+                    for index in out[state]:
+                        yield i - lengths[index], index
+
+    def finditer(self, source_str, start=0, end=None):
+        """返回 (位置, 搜索词序号)，按匹配结束位置的先后排列"""
+        end = len(source_str) if end is None else min(end, len(source_str))
+        return self._scan(_blocks(_to_bytes(source_str), start, end))
+
+    def finditer_stream(self, chunks):
+        """在依次到来的字节块中查找，状态跨块保留，所以不需要块间重叠"""
+        return self._scan(_stream_blocks(chunks))
+
+    def count(self, source_str, start=0, end=None):
+        """统计所有搜索词出现的总次数"""
+        count = 0
+        for _ in self.finditer(source_str, start, end):
+            count += 1
+        return count
+
+
+def aho_corasick_finditer(source_str, search_strs):
+    """一次扫描找出search_strs中每个搜索词的每次出现，返回 (位置, 搜索词序号)"""
+    return AhoCorasick(search_strs).finditer(source_str)
+
+
+def aho_corasick_finditer_file(path, search_strs):
+    """通过mmap在文件中查找多个搜索词"""
+    automaton = AhoCorasick(search_strs)
+    with mapped_file(path) as source_str:
+        for match in automaton.finditer(source_str):
+            yield match
+
+
+def _load_patterns(path):
+    with open(path, 'rb') as f:
+        return [line.rstrip(b'\r\n') for line in f if line.strip()]
+
+
+def _report_matches(source, automaton, matches, args):
+    if args.count:
+        print('%s:%d' % (source, sum(1 for _ in matches)))
+        return
+    found = False
+    for pos, index in matches:
+        print('%s:%d:%s' % (source, pos, automaton.patterns[index].decode('utf-8', 'replace')))
+        found = True
+        if not args.all:
+            return
+    if not found:
+        print('%s:%d' % (source, -1))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        usage='python %(prog)s [--all | --count] [-e search_string ...] [-f patterns_file] '
+              'search_string source_string/source_file_path/- [...]')
+    parser.add_argument('search_str', nargs='?')
+    parser.add_argument('sources', nargs='*')
+    parser.add_argument('-e', '--regexp', action='append', default=[],
+                        help='search string, may be given several times')
+    parser.add_argument('-f', '--file', help='read search strings one per line')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('-a', '--all', action='store_true',
+                      help='print the offset of every match')
+    mode.add_argument('-c', '--count', action='store_true',
+                      help='only print the number of matches')
+    args = parser.parse_args(argv)
+
+    search_strs = list(args.regexp)
+    if args.file:
+        search_strs.extend(_load_patterns(args.file))
+    sources = args.sources
+    if search_strs:
+        # 搜索词已经通过 -e/-f 给出，第一个位置参数也是源
+        if args.search_str is not None:
+            sources = [args.search_str] + sources
+    elif args.search_str is not None:
+        search_strs = [args.search_str]
+    if not search_strs or not sources:
+        parser.error('a search string and at least one source are required')
+
+    automaton = AhoCorasick(search_strs)
+    for source in sources:
+        if source == '-':
+            matches = automaton.finditer_stream(read_chunks(_stdin_bytes()))
+            _report_matches(source, automaton, matches, args)
+        elif not os.path.exists(source):
+            _report_matches(source, automaton, automaton.finditer(source), args)
+        else:
+            with mapped_file(source) as source_str:
+                _report_matches(source, automaton, automaton.finditer(source_str), args)
+
+
+if __name__ == '__main__':
+    main()
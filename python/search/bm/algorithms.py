@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+'''
+search.py 之外的几种单模式查找算法，接口与 search.BoyerMoore 相同
+（search/finditer/count），并按搜索词的特点自动选择其中一种。
+
+    >>> pattern = compile(b'ERROR')
+    >>> pattern
+    Sunday(b'ERROR')
+    >>> from search import boyer_moore_count_file
+    >>> boyer_moore_count_file('/var/log/messages', pattern)
+
+编译好的对象可以直接传给 search.py 中的各个查找函数（文件、数据流、多进程）。
+
+http://www-igm.univ-mlv.fr/~lecroq/string/
+'''
+from search import BoyerMoore, Pattern, _to_bytes, bad_char_table, good_suffix_table
+
+
+# 不超过这个长度的搜索词算短搜索词，用Horspool或Sunday
+SHORT_NEEDLE = 16
+# 超过这个长度、并且最小周期不超过长度一半的搜索词用Two-Way，保证最坏情况线性
+LONG_NEEDLE = 32
+
+
+class SingleByte(Pattern):
+    """单个字符直接用源串自己的find，也就是C实现的memchr"""
+
+    def _finditer(self, source_str, start, n):
+        search_str = self.search_str
+        find = source_str.find
+        pos = find(search_str, start, n)
+        while pos != -1:
+            yield pos
+            pos = find(search_str, pos + 1, n)
+
+    def count(self, source_str, start=0, end=None):
+        # 单个字符不会重叠，bytes/str的count就是结果；更长的模式可能重叠，
+        # count只数不重叠的，要逐个查找；mmap没有count方法
+        if len(self.search_str) == 1 and hasattr(source_str, 'count'):
+            n = len(source_str) if end is None else end
+            return source_str.count(self.search_str, start, n)
+        return Pattern.count(self, source_str, start, end)
+
+
+class Horspool(Pattern):
+    """Boyer-Moore-Horspool：只用窗口最后一个字符决定后移位数"""
+
+    def __init__(self, search_str):
+        Pattern.__init__(self, search_str)
+        self.bad_char = bad_char_table(search_str)
+
+    def _finditer(self, source_str, start, n):
+        search_str = self.search_str
+        m = len(search_str)
+        get = self.bad_char.get
+        # 后移位数 = m - 1 - 该字符在搜索词（不含最后一个字符）中最后一次出现的位置
+        last_index = m - 1
+        pos = start
+        last = n - m
+        while pos <= last:
+            c = source_str[pos + last_index]
+            if c == search_str[last_index]:
+                j = last_index - 1
+                while j >= 0 and search_str[j] == source_str[pos + j]:
+                    j -= 1
+                if j < 0:
+                    yield pos
+            pos += last_index - get(c, -1)
+
+
+class Sunday(Pattern):
+    """Sunday (Quick Search)：用窗口之后的那个字符决定后移位数，最多可以后移 m+1"""
+
+    def __init__(self, search_str):
+        Pattern.__init__(self, search_str)
+        shift = {}
+        m = len(search_str)
+        for index in range(m):
+            shift[search_str[index]] = m - index
+        self.shift = shift
+
+    def _finditer(self, source_str, start, n):
+        search_str = self.search_str
+        m = len(search_str)
+        get = self.shift.get
+        default = m + 1
+        pos = start
+        last = n - m
+        while pos <= last:
+            j = 0
+            while j < m and search_str[j] == source_str[pos + j]:
+                j += 1
+            if j == m:
+                yield pos
+            if pos == last:
+                break
+            pos += get(source_str[pos + m], default)
+
+
+def _maximal_suffix(search_str, reverse):
+    """按字典序（reverse时为反序）求最大后缀，返回 (起点前一个位置, 周期)"""
+    m = len(search_str)
+    ms = -1
+    j = 0
+    k = p = 1
+    while j + k < m:
+        a = search_str[j + k]
+        b = search_str[ms + k]
+        if (a > b) if reverse else (a < b):
+            j += k
+            k = 1
+            p = j - ms
+        elif a == b:
+            if k != p:
+                k += 1
+            else:
+                j += p
+                k = 1
+        else:
+            ms = j
+            j = ms + 1
+            k = p = 1
+    return ms, p
+
+
+class TwoWay(Pattern):
+    """Crochemore-Perrin Two-Way：按临界分解把搜索词分成左右两半，
+    先从左到右比较右半，再从右到左比较左半，最坏情况也是线性的，且只用常数额外空间。
+    """
+
+    def __init__(self, search_str):
+        Pattern.__init__(self, search_str)
+        i, p = _maximal_suffix(search_str, False)
+        j, q = _maximal_suffix(search_str, True)
+        if i > j:
+            ell, period = i, p
+        else:
+            ell, period = j, q
+        m = len(search_str)
+        # 左半部分在周期为period的位置上再次出现，说明搜索词本身是周期的
+        self.periodic = search_str[:ell + 1] == search_str[period:period + ell + 1]
+        if not self.periodic:
+            period = max(ell + 1, m - ell - 1) + 1
+        self.ell = ell
+        self.period = period
+
+    def _finditer(self, source_str, start, n):
+        search_str = self.search_str
+        m = len(search_str)
+        ell = self.ell
+        period = self.period
+        pos = start
+        last = n - m
+        if self.periodic:
+            # memory 记录上次已经确认匹配的左半长度，避免重复比较
+            memory = -1
+            while pos <= last:
+                i = max(ell, memory) + 1
+                while i < m and search_str[i] == source_str[pos + i]:
+                    i += 1
+                if i >= m:
+                    i = ell
+                    while i > memory and search_str[i] == source_str[pos + i]:
+                        i -= 1
+                    if i <= memory:
+                        yield pos
+                    pos += period
+                    memory = m - period - 1
+                else:
+                    pos += i - ell
+                    memory = -1
+        else:
+            while pos <= last:
+                i = ell + 1
+                while i < m and search_str[i] == source_str[pos + i]:
+                    i += 1
+                if i >= m:
+                    i = ell
+                    while i >= 0 and search_str[i] == source_str[pos + i]:
+                        i -= 1
+                    if i < 0:
+                        yield pos
+                    pos += period
+                else:
+                    pos += i - ell
+
+
+# python3中bytes/mmap下标取值得到整数，python2中得到单个字符
+if isinstance(b'a'[0], int):
+    _element = int
+else:
+    _element = chr
+
+_ALL_BYTES = frozenset(range(256))
+_DIGITS = frozenset(range(ord('0'), ord('9') + 1))
+_LETTERS = frozenset(range(ord('a'), ord('z') + 1)) | frozenset(range(ord('A'), ord('Z') + 1))
+_ESCAPES = {
+    ord('d'): _DIGITS,
+    ord('w'): _DIGITS | _LETTERS | frozenset([ord('_')]),
+    ord('s'): frozenset(bytearray(b' \t\r\n\x0b\x0c')),
+}
+
+
+def _fold_case(members):
+    """加上集合中字母的另一种大小写"""
+    return frozenset(members) | frozenset(bytearray(bytes(bytearray(members)).swapcase()))
+
+
+def _parse_bracket(data, i, ignore_case=False):
+    """解析 [...]，i指向'['，返回 (字节集合, ']'之后的位置)
+
+    不区分大小写时先折叠成员再取补集，[^a] 不匹配 a 也不匹配 A。
+    """
+    i += 1
+    negate = i < len(data) and data[i] == ord('^')
+    if negate:
+        i += 1
+    members = set()
+    first = True
+    while i < len(data) and (data[i] != ord(']') or first):
+        first = False
+        c = data[i]
+        if c == ord('\\') and i + 1 < len(data):
+            members |= _ESCAPES.get(data[i + 1], frozenset([data[i + 1]]))
+            i += 2
+        elif i + 2 < len(data) and data[i + 1] == ord('-') and data[i + 2] != ord(']'):
+            members.update(range(c, data[i + 2] + 1))
+            i += 3
+        else:
+            members.add(c)
+            i += 1
+    if i >= len(data):
+        raise ValueError('unterminated [ in %r' % (bytes(data),))
+    if ignore_case:
+        members = _fold_case(members)
+    return (_ALL_BYTES - members) if negate else frozenset(members), i + 1
+
+
+def parse_byte_classes(search_str, ignore_case=False, classes=True):
+    """把搜索词转成每个位置允许出现的字节集合的列表
+
+    classes为True时支持 \\d 数字、\\w 单词字符、\\s 空白、. 任意字节、[a-z0-9] 和 [^...]，
+    其它字符前加反斜杠表示字符本身；ignore_case为True时字母不区分大小写。
+    """
+    data = bytearray(_to_bytes(search_str))
+    result = []
+    i = 0
+    while i < len(data):
+        c = data[i]
+        if classes and c == ord('\\') and i + 1 < len(data):
+            members = _ESCAPES.get(data[i + 1], frozenset([data[i + 1]]))
+            i += 2
+        elif classes and c == ord('.'):
+            members = _ALL_BYTES
+            i += 1
+        elif classes and c == ord('['):
+            # 方括号在取补集之前已经折叠过大小写，取补集之后不能再折叠
+            members, i = _parse_bracket(data, i, ignore_case)
+            result.append(members)
+            continue
+        else:
+            members = frozenset([c])
+            i += 1
+        if ignore_case:
+            members = _fold_case(members)
+        result.append(members)
+    return result
+
+
+class ByteClassHorspool(Pattern):
+    """每个位置是一个字节集合的Horspool查找，用于不区分大小写和字节类
+
+    大小写和字节类都折叠进位移表：字节c的后移位数由它能匹配的最靠右的位置
+    （不含最后一个）决定，所以查找直接在原始数据上进行，不需要先把整个数据
+    转成小写。
+    """
+
+    def __init__(self, search_str, ignore_case=False, classes=True):
+        Pattern.__init__(self, search_str)
+        self.ignore_case = ignore_case
+        self.classes = [frozenset(_element(b) for b in members)
+                        for members in parse_byte_classes(search_str, ignore_case, classes)]
+        m = len(self.classes)
+        shift = dict((_element(b), m) for b in range(256))
+        for index in range(m - 1):
+            for c in self.classes[index]:
+                shift[c] = m - 1 - index
+        self.shift = shift
+
+    def __len__(self):
+        return len(self.classes)
+
+    def _finditer(self, source_str, start, n):
+        classes = self.classes
+        shift = self.shift
+        m = len(classes)
+        last_index = m - 1
+        last_class = classes[last_index]
+        pos = start
+        last = n - m
+        while pos <= last:
+            c = source_str[pos + last_index]
+            if c in last_class:
+                j = last_index - 1
+                while j >= 0 and source_str[pos + j] in classes[j]:
+                    j -= 1
+                if j < 0:
+                    yield pos
+            pos += shift[c]
+
+
+ALGORITHMS = {
+    'bm': BoyerMoore,
+    'horspool': Horspool,
+    'sunday': Sunday,
+    'two-way': TwoWay,
+    'memchr': SingleByte,
+}
+
+
+def choose_algorithm(search_str):
+    """根据搜索词长度、字符种类和周期选择算法，返回算法类
+
+    * 0或1个字符：直接用find（memchr）
+    * 短搜索词：字符种类多时Sunday的后移位数更大，字符种类少（DNA、二进制）时用Horspool
+    * 长而且周期短的搜索词：Two-Way，避免Boyer-Moore在周期串上的反复比较
+    * 其余：Boyer-Moore
+    """
+    m = len(search_str)
+    if m <= 1:
+        return SingleByte
+    if m <= SHORT_NEEDLE:
+        if len(set(search_str)) * 2 >= m:
+            return Sunday
+        return Horspool
+    if m >= LONG_NEEDLE and good_suffix_table(search_str)[0] * 2 <= m:
+        return TwoWay
+    return BoyerMoore
+
+
+def compile(search_str, algorithm='auto', ignore_case=False, classes=False):
+    """编译搜索词，algorithm 为 'auto' 或 ALGORITHMS 中的名字
+
+    ignore_case 或 classes 为True时总是使用ByteClassHorspool，只能查找字节数据。
+    """
+    if hasattr(search_str, 'finditer'):
+        return search_str
+    if ignore_case or classes:
+        return ByteClassHorspool(search_str, ignore_case, classes)
+    if algorithm == 'auto':
+        cls = choose_algorithm(search_str)
+    else:
+        cls = ALGORITHMS[algorithm]
+    return cls(search_str)
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import argparse
+import heapq
+import os
+
+from search import (
+    _blocks,
+    _stdin_bytes,
+    _stream_blocks,
+    _to_bytes,
+    compile,
+    mapped_file,
+    read_chunks,
+    )
+
+
+# 近似查找，允许最多k个错误，命令行用法与 search.py 一致
+# python approximate.py -k 1 --all 'connection reset' /var/log/messages
+# python approximate.py -k 2 --hamming --count 00200100 /data/dump.bin
+# cat /var/log/messages | python approximate.py -k 1 -a request_id -
+
+# https://en.wikipedia.org/wiki/Bitap_algorithm
+# Wu S., Manber U. Fast text searching allowing errors. 1992
+
+# 切分出来的每一段短于这个长度时过滤效果很差，直接整段用Bitap扫描
+MIN_PIECE = 3
+
+
+def _shifted(positions, offset):
+    for pos in positions:
+        yield pos - offset
+
+
+class Approximate(object):
+    """允许最多k个错误的Bitap（Wu-Manber）查找
+
+    hamming=False 时错误是编辑距离（替换、插入、删除），返回 (匹配结束位置, 错误数)，
+    结束位置是匹配最后一个字节之后的偏移，对同一个结束位置只报告最少的错误数；
+    hamming=True 时只允许替换（k-mismatch），返回 (匹配开始位置, 错误数)。
+
+    把搜索词切成k+1段，有k个以内错误的匹配一定完整包含其中一段（鸽巢原理），
+    所以先用Boyer-Moore精确查找各段，只在找到的段附近用Bitap验证，
+    其余区域直接跳过。
+    """
+
+    def __init__(self, search_str, k, hamming=False):
+        self.search_str = _to_bytes(search_str)
+        self.k = k
+        self.hamming = hamming
+        m = len(self.search_str)
+        if m == 0:
+            raise ValueError('empty search string')
+        if k < 0:
+            raise ValueError('k must not be negative')
+
+        # masks[c] 的第i位为1表示搜索词第i个字节是c
+        masks = [0] * 256
+        for i, c in enumerate(bytearray(self.search_str)):
+            masks[c] |= 1 << i
+        self.masks = masks
+
+        # (段在搜索词中的偏移, 编译好的段)
+        bounds = [i * m // (k + 1) for i in range(k + 2)]
+        if m // (k + 1) >= MIN_PIECE:
+            self.pieces = [(bounds[i], compile(self.search_str[bounds[i]:bounds[i + 1]]))
+                           for i in range(k + 1)]
+        else:
+            self.pieces = None
+
+    def __len__(self):
+        return len(self.search_str)
+
+    def _bitap(self, blocks):
+        """在 (偏移, bytearray) 块上运行Bitap，状态跨块保留，返回 (结束位置, 错误数)"""
+        masks = self.masks
+        k = self.k
+        hamming = self.hamming
+        m = len(self.search_str)
+        hit = 1 << (m - 1)
+        full = (1 << m) - 1
+        # r[d] 的第i位为1表示搜索词前i+1个字节能以不超过d个错误匹配到当前位置
+        if hamming:
+            r = [0] * (k + 1)
+        else:
+            r = [(1 << d) - 1 for d in range(k + 1)]
+        levels = range(1, k + 1)
+        for base, block in blocks:
+            for i, c in enumerate(block, base + 1):
+                mask = masks[c]
+                old = r[0]
+                new = ((old << 1) | 1) & mask
+                r[0] = new
+                for d in levels:
+                    cur = r[d]
+                    if hamming:
+                        # 匹配 | 替换
+                        nxt = ((((cur << 1) | 1) & mask) | ((old << 1) | 1)) & full
+                    else:
+                        # 匹配 | 插入 | 替换 | 删除
+                        nxt = ((((cur << 1) | 1) & mask) | old | ((old << 1) | 1)
+                               | ((new << 1) | 1)) & full
+                    old = cur
+                    new = nxt
+                    r[d] = nxt
+                if new & hit:
+                    d = 0
+                    while not r[d] & hit:
+                        d += 1
+                    yield i, d
+
+    def _candidates(self, source_str, start, n):
+        """各段精确出现的位置推出的匹配开始位置，从小到大，可能重复"""
+        return heapq.merge(*[_shifted(piece.finditer(source_str, start, n), offset)
+                             for offset, piece in self.pieces])
+
+    def _finditer_hamming(self, source_str, start, n):
+        search_str = self.search_str
+        m = len(search_str)
+        k = self.k
+        last = -1
+        for pos in self._candidates(source_str, start, n):
+            if pos == last or pos < start or pos > n - m:
+                continue
+            last = pos
+            errors = 0
+            for j in range(m):
+                if search_str[j] != source_str[pos + j]:
+                    errors += 1
+                    if errors > k:
+                        break
+            else:
+                yield pos, errors
+
+    def _finditer_edit(self, source_str, start, n):
+        m = len(self.search_str)
+        k = self.k
+        # 每个候选开始位置对应的窗口 [pos-k, pos+m+k)，相交的窗口合并后再扫描
+        lo = hi = None
+        for pos in self._candidates(source_str, start, n):
+            a = max(start, pos - k)
+            b = min(n, pos + m + k)
+            if hi is not None and a <= hi:
+                hi = max(hi, b)
+                continue
+            if hi is not None:
+                for match in self._bitap(_blocks(source_str, lo, hi)):
+                    yield match
+            lo, hi = a, b
+        if hi is not None:
+            for match in self._bitap(_blocks(source_str, lo, hi)):
+                yield match
+
+    def finditer(self, source_str, start=0, end=None):
+        source_str = _to_bytes(source_str)
+        n = len(source_str) if end is None else min(end, len(source_str))
+        if self.pieces is None:
+            return self._finditer_scan(_blocks(source_str, start, n))
+        if self.hamming:
+            return self._finditer_hamming(source_str, start, n)
+        return self._finditer_edit(source_str, start, n)
+
+    def _finditer_scan(self, blocks):
+        m = len(self.search_str)
+        for end, errors in self._bitap(blocks):
+            if self.hamming:
+                yield end - m, errors
+            else:
+                yield end, errors
+
+    def finditer_stream(self, chunks):
+        """在依次到来的字节块中查找，Bitap状态跨块保留，不需要块间重叠"""
+        return self._finditer_scan(_stream_blocks(chunks))
+
+    def count(self, source_str, start=0, end=None):
+        count = 0
+        for _ in self.finditer(source_str, start, end):
+            count += 1
+        return count
+
+
+def approximate_finditer(source_str, search_str, k, hamming=False):
+    """在source_str中查找最多有k个错误的search_str，返回 (位置, 错误数)"""
+    return Approximate(search_str, k, hamming).finditer(source_str)
+
+
+def approximate_finditer_file(path, search_str, k, hamming=False):
+    """通过mmap在文件中近似查找"""
+    pattern = Approximate(search_str, k, hamming)
+    with mapped_file(path) as source_str:
+        for match in pattern.finditer(source_str):
+            yield match
+
+
+def _report_matches(source, matches, args):
+    if args.count:
+        print('%s:%d' % (source, sum(1 for _ in matches)))
+        return
+    found = False
+    for pos, errors in matches:
+        print('%s:%d:%d' % (source, pos, errors))
+        found = True
+        if not args.all:
+            return
+    if not found:
+        print('%s:%d' % (source, -1))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        usage='python %(prog)s [-k N] [--hamming] [--all | --count] search_string '
+              'source_string/source_file_path/- [source_string/source_file_path/- ...]')
+    parser.add_argument('search_str')
+    parser.add_argument('sources', nargs='+')
+    parser.add_argument('-k', '--errors', type=int, default=1,
+                        help='maximum number of errors')
+    parser.add_argument('--hamming', action='store_true',
+                        help='only allow substitutions and print start offsets '
+                             '(default: edit distance, print end offsets)')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('-a', '--all', action='store_true',
+                      help='print every match')
+    mode.add_argument('-c', '--count', action='store_true',
+                      help='only print the number of matches')
+    args = parser.parse_args(argv)
+
+    pattern = Approximate(args.search_str, args.errors, args.hamming)
+    for source in args.sources:
+        if source == '-':
+            matches = pattern.finditer_stream(read_chunks(_stdin_bytes()))
+            _report_matches(source, matches, args)
+        elif not os.path.exists(source):
+            _report_matches(source, pattern.finditer(source), args)
+        else:
+            with mapped_file(source) as source_str:
+                _report_matches(source, pattern.finditer(source_str), args)
+
+
+if __name__ == '__main__':
+    main()
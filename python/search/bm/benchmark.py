@@ -0,0 +1,358 @@
+# -*- coding: utf-8 -*-
+'''
+search.py 的性能测试。
+
+# 各种语料、各种长度的搜索词，各个算法与 bytes.find、re 比较，结果输出为JSON
+python benchmark.py corpus --size 1 --output bench.json
+# 与上次的结果比较，吞吐率下降超过20%的组合会列出来，并以状态1退出
+python benchmark.py corpus --size 1 --baseline bench.json
+
+# 多进程查找在不同进程数下的扩展曲线
+python benchmark.py parallel --size 256
+
+# 压缩文件：边解压边查找，与 gzip -dc | search.py、先解压到临时文件再查找比较
+python benchmark.py compressed --size 64
+'''
+from __future__ import print_function
+
+import argparse
+import bz2
+import gzip
+import json
+import multiprocessing
+import os
+import platform
+import random
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import algorithms
+from search import (
+    boyer_moore_count_compressed,
+    boyer_moore_count_file,
+    boyer_moore_count_parallel,
+    open_compressed,
+    )
+
+
+NEEDLE_LENGTHS = (2, 4, 8, 16, 32, 64, 128)
+
+
+def random_text(rnd, size):
+    """小写字母加空格的随机文本"""
+    letters = b'abcdefghijklmnopqrstuvwxyz '
+    return bytes(bytearray(rnd.choice(letters) for _ in range(size)))
+
+
+def dna_text(rnd, size):
+    """只有ACGT四个字符的文本，字符种类少，坏字符规则能跳的距离短"""
+    return bytes(bytearray(rnd.choice(b'ACGT') for _ in range(size)))
+
+
+def repetitive_binary(rnd, size):
+    """类似search.py用法示例里 00200100 的数据：大部分是0，偶尔出现1和2"""
+    data = bytearray(b'0' * size)
+    for _ in range(size // 16):
+        data[rnd.randrange(size)] = rnd.choice(b'12')
+    return bytes(data)
+
+
+def log_text(rnd, size):
+    """模拟应用日志的文本"""
+    levels = ['INFO', 'INFO', 'INFO', 'DEBUG', 'WARN', 'ERROR']
+    messages = ['request finished', 'cache miss', 'connection reset by peer',
+                'retrying upstream', 'user login', 'disk quota exceeded']
+    lines = []
+    total = 0
+    while total < size:
+        line = '2026-10-%02d %02d:%02d:%02d %-5s [worker-%d] %s id=%08x status=%d\n' % (
+            rnd.randint(1, 28), rnd.randint(0, 23), rnd.randint(0, 59), rnd.randint(0, 59),
+            rnd.choice(levels), rnd.randint(0, 31), rnd.choice(messages),
+            rnd.getrandbits(32), rnd.choice((200, 200, 200, 404, 500)))
+        lines.append(line)
+        total += len(line)
+    return ''.join(lines).encode('ascii')[:size]
+
+
+CORPORA = {
+    'random': random_text,
+    'dna': dna_text,
+    'binary': repetitive_binary,
+    'log': log_text,
+}
+
+
+def _count_find(source_str, needle):
+    count = 0
+    pos = source_str.find(needle)
+    while pos != -1:
+        count += 1
+        pos = source_str.find(needle, pos + 1)
+    return count
+
+
+def _count_re(source_str, needle):
+    # 前瞻断言，和其它方法一样统计可以重叠的匹配
+    return sum(1 for _ in re.finditer(b'(?=' + re.escape(needle) + b')', source_str))
+
+
+def methods():
+    """参加比较的方法：名字 -> 统计次数的函数(source_str, needle)"""
+    result = {
+        'bytes.find': _count_find,
+        're': _count_re,
+        'auto': lambda source_str, needle: algorithms.compile(needle).count(source_str),
+    }
+    for name, cls in algorithms.ALGORITHMS.items():
+        if name != 'memchr':
+            result[name] = (lambda cls: lambda source_str, needle: cls(needle).count(source_str))(cls)
+    return result
+
+
+def _best_time(func, args, repeat):
+    best = None
+    for _ in range(repeat):
+        t = time.time()
+        result = func(*args)
+        elapsed = time.time() - t
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench_corpus(size_mb=1.0, repeat=3, seed=0, corpora=None, needle_lengths=NEEDLE_LENGTHS):
+    """在每种语料上、对每种搜索词长度比较各个方法，返回结果列表
+
+    搜索词从语料中随机截取，所以至少出现一次；同一个seed生成的数据完全相同。
+    """
+    size = int(size_mb * (1 << 20))
+    results = []
+    for corpus in sorted(corpora or CORPORA):
+        rnd = random.Random('%s-%d' % (corpus, seed))
+        source_str = CORPORA[corpus](rnd, size)
+        for m in needle_lengths:
+            start = rnd.randrange(len(source_str) - m)
+            needle = source_str[start:start + m]
+            for name, func in sorted(methods().items()):
+                seconds, count = _best_time(func, (source_str, needle), repeat)
+                results.append({
+                    'corpus': corpus,
+                    'needle_len': m,
+                    'method': name,
+                    'seconds': seconds,
+                    'mb_per_s': len(source_str) / float(1 << 20) / max(seconds, 1e-9),
+                    'count': count,
+                })
+    return results
+
+
+def compare(results, baseline, tolerance=0.2):
+    """返回吞吐率比baseline低tolerance以上的 (结果, 基准吞吐率) 列表"""
+    key = lambda r: (r['corpus'], r['needle_len'], r['method'])
+    base = dict((key(r), r['mb_per_s']) for r in baseline)
+    slower = []
+    for r in results:
+        before = base.get(key(r))
+        if before and r['mb_per_s'] < before * (1 - tolerance):
+            slower.append((r, before))
+    return slower
+
+
+def make_file(size_mb, needle, every=1 << 16, seed=0):
+    """生成size_mb大小的临时文件，每隔大约every字节放一个needle，返回路径"""
+    rnd = random.Random(seed)
+    letters = b'abcdefghijklmnopqrstuvwxyz '
+    block = bytearray(rnd.choice(letters) for _ in range(every))
+    block[every // 2:every // 2 + len(needle)] = needle
+    fd, path = tempfile.mkstemp(suffix='.bench')
+    with os.fdopen(fd, 'wb') as f:
+        for _ in range(size_mb * (1 << 20) // every):
+            f.write(block)
+    return path
+
+
+def _worker_counts(max_workers):
+    counts = []
+    n = 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+
+def bench_parallel(path, needle, max_workers=None, repeat=3):
+    """测量不同进程数下多进程查找的吞吐率，返回每个进程数的结果"""
+    size = os.path.getsize(path)
+    results = []
+    base = None
+    for workers in _worker_counts(max_workers or multiprocessing.cpu_count()):
+        best, count = _best_time(boyer_moore_count_parallel, (path, needle, workers), repeat)
+        if base is None:
+            base = best
+        results.append({
+            'workers': workers,
+            'seconds': best,
+            'mb_per_s': size / float(1 << 20) / best,
+            'speedup': base / best,
+            'count': count,
+        })
+    return results
+
+
+def _which(name):
+    for directory in os.environ.get('PATH', '').split(os.pathsep):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    return None
+
+
+def _count_decompressed_copy(path, needle):
+    """先完整解压到临时文件，再mmap查找"""
+    fd, tmp = tempfile.mkstemp(suffix='.bench')
+    try:
+        f = open_compressed(path)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                shutil.copyfileobj(f, out, 1 << 20)
+        finally:
+            f.close()
+        return boyer_moore_count_file(tmp, needle)
+    finally:
+        os.remove(tmp)
+
+
+def _count_pipeline(tool, path, needle):
+    """用外部解压程序作为管道的前一步：gzip -dc path | python search.py -c needle -"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'search.py')
+    decompress = subprocess.Popen([tool, '-dc', path], stdout=subprocess.PIPE)
+    output = subprocess.check_output(
+        [sys.executable, script, '--algorithm', 'bm', '-c', needle, '-'],
+        stdin=decompress.stdout)
+    decompress.stdout.close()
+    decompress.wait()
+    return int(output.decode('ascii').rsplit(':', 1)[1])
+
+
+def bench_compressed(size_mb, needle, repeat=3, seed=0):
+    """比较gzip/bz2文件的三种查找方式，返回结果列表"""
+    data = log_text(random.Random('compressed-%d' % seed), int(size_mb * (1 << 20)))
+    results = []
+    for fmt, opener, tool in (('gzip', gzip.GzipFile, 'gzip'), ('bz2', bz2.BZ2File, 'bzip2')):
+        fd, path = tempfile.mkstemp(suffix='.' + fmt)
+        os.close(fd)
+        try:
+            f = opener(path, 'wb')
+            f.write(data)
+            f.close()
+            ways = [('stream', boyer_moore_count_compressed, (path, needle)),
+                    ('decompress-to-temp', _count_decompressed_copy, (path, needle))]
+            if _which(tool):
+                ways.append(('%s -dc | search.py' % tool, _count_pipeline,
+                             (_which(tool), path, needle.decode('ascii'))))
+            for name, func, args in ways:
+                seconds, count = _best_time(func, args, repeat)
+                results.append({
+                    'format': fmt,
+                    'method': name,
+                    'seconds': seconds,
+                    'mb_per_s': len(data) / float(1 << 20) / seconds,
+                    'count': count,
+                })
+        finally:
+            os.remove(path)
+    return results
+
+
+def _meta(args):
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': multiprocessing.cpu_count(),
+        'args': dict((k, v) for k, v in vars(args).items() if k != 'func'),
+    }
+
+
+def _run_corpus(args):
+    results = bench_corpus(args.size, args.repeat, args.seed, args.corpus)
+    print('%-8s %6s %-12s %10s' % ('corpus', 'needle', 'method', 'MB/s'), file=sys.stderr)
+    for r in results:
+        print('%-8s %6d %-12s %10.1f'
+              % (r['corpus'], r['needle_len'], r['method'], r['mb_per_s']), file=sys.stderr)
+
+    report = {'meta': _meta(args), 'results': results}
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        print(json.dumps(report, indent=2, sort_keys=True))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        slower = compare(results, baseline, args.tolerance)
+        for r, before in slower:
+            print('REGRESSION %s needle=%d %s: %.1f MB/s, was %.1f MB/s'
+                  % (r['corpus'], r['needle_len'], r['method'], r['mb_per_s'], before),
+                  file=sys.stderr)
+        if slower:
+            sys.exit(1)
+
+
+def _run_parallel(args):
+    needle = b'ERROR: disk quota exceeded'
+    path = make_file(args.size, needle)
+    try:
+        print('workers    seconds      MB/s   speedup')
+        for r in bench_parallel(path, needle, args.workers, args.repeat):
+            print('%7d %10.3f %9.1f %9.2f'
+                  % (r['workers'], r['seconds'], r['mb_per_s'], r['speedup']))
+    finally:
+        os.remove(path)
+
+
+def _run_compressed(args):
+    print('%-6s %-22s %10s %9s %8s' % ('format', 'method', 'seconds', 'MB/s', 'count'))
+    for r in bench_compressed(args.size, b'disk quota exceeded', args.repeat):
+        print('%-6s %-22s %10.3f %9.1f %8d'
+              % (r['format'], r['method'], r['seconds'], r['mb_per_s'], r['count']))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest='command')
+
+    corpus = subparsers.add_parser('corpus', help='compare algorithms on synthetic corpora')
+    corpus.add_argument('--size', type=float, default=1, help='corpus size in MB')
+    corpus.add_argument('--repeat', type=int, default=3)
+    corpus.add_argument('--seed', type=int, default=0)
+    corpus.add_argument('--corpus', action='append', choices=sorted(CORPORA))
+    corpus.add_argument('--output', help='write JSON here instead of stdout')
+    corpus.add_argument('--baseline', help='JSON from an earlier run to compare with')
+    corpus.add_argument('--tolerance', type=float, default=0.2)
+    corpus.set_defaults(func=_run_corpus)
+
+    parallel = subparsers.add_parser('parallel', help='parallel file search scaling')
+    parallel.add_argument('--size', type=int, default=64, help='file size in MB')
+    parallel.add_argument('--workers', type=int, default=None)
+    parallel.add_argument('--repeat', type=int, default=3)
+    parallel.set_defaults(func=_run_parallel)
+
+    compressed = subparsers.add_parser('compressed', help='search gzip/bz2 files')
+    compressed.add_argument('--size', type=float, default=16,
+                            help='uncompressed size in MB')
+    compressed.add_argument('--repeat', type=int, default=3)
+    compressed.set_defaults(func=_run_compressed)
+
+    args = parser.parse_args()
+    if not getattr(args, 'func', None):
+        parser.error('a command is required')
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
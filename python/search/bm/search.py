@@ -1,4 +1,13 @@
 # -*- coding: utf-8 -*-
+from __future__ import print_function
+
+import argparse
+import bz2
+import contextlib
+import gzip
+import io
+import mmap
+import multiprocessing
 import os
 import sys
 import gc
@@ -6,16 +15,221 @@ import gc
 
 # python search.py "EXAMPLE" "HERE IS A SIMPLE EXAMPLE"
 # python search.py 00200100 00000200100
+# python search.py --trace 00200100 00000200100
+# python search.py --count ERROR /var/log/messages
+#
+# 给出的是文件路径时，通过mmap只读映射后直接在映射上查找，不会把整个文件读进内存，
+# 内存占用由操作系统的页缓存决定，与文件大小无关。
+#
+# cat /var/log/messages | python search.py --all ERROR -
+# python search.py --jobs 32 --count ERROR /data/huge.log
+# python search.py --count ERROR /var/log/messages.1.gz /var/log/messages.2.bz2
 
 # http://www.ruanyifeng.com/blog/2013/05/boyer-moore_string_search_algorithm.html
 
-def boyer_moore_search(source_str, search_str):
+CHUNK_SIZE = 1 << 20
+# 逐字节扫描的算法（aho_corasick.py、approximate.py）每次取出这么多字节转成bytearray
+BLOCK_SIZE = 1 << 16
+
+
+def _to_bytes(s):
+    """命令行参数在python3中是str，文件内容是bytes，搜索前统一成bytes
+
+    bytes、bytearray、mmap等本来就是字节的对象原样返回。
+    """
+    if isinstance(s, type(u'')):
+        return s.encode('utf-8')
+    return s
+
+
+def bad_char_table(search_str):
+    """坏字符表：字符 -> 在搜索词中（不含最后一个字符）最后一次出现的位置
+
+    键是对搜索词逐个取值得到的元素，python2的str/python3的bytes/unicode
+    各自和同类型的源串下标取值一致，所以同一张表可以直接用于源串。
+    """
+    bad_char = {}
+    for index in range(len(search_str) - 1):
+        bad_char[search_str[index]] = index
+    return bad_char
+
+
+def _suffixes(search_str):
+    """suff[i] 为以位置i结尾的子串与搜索词的最长公共后缀长度，线性时间"""
+    m = len(search_str)
+    suff = [0] * m
+    suff[m - 1] = m
+    g = m - 1
+    f = 0
+    for i in range(m - 2, -1, -1):
+        if i > g and suff[i + m - 1 - f] < i - g:
+            suff[i] = suff[i + m - 1 - f]
+        else:
+            if i < g:
+                g = i
+            f = i
+            while g >= 0 and search_str[g] == search_str[g + m - 1 - f]:
+                g -= 1
+            suff[i] = f - g
+    return suff
+
+
+def good_suffix_table(search_str):
+    """好后缀表：gs[j] 为在搜索词位置j失配（j之后已全部匹配）时的后移位数
+
+    gs[0] 同时也是完整匹配之后的后移位数，即搜索词的最小周期。
+    """
+    m = len(search_str)
+    suff = _suffixes(search_str)
+    gs = [m] * m
+
+    # 好后缀在搜索词中没有再次出现，但它的某个后缀是搜索词的前缀
+    j = 0
+    for i in range(m - 1, -1, -1):
+        if suff[i] == i + 1:
+            while j < m - 1 - i:
+                if gs[j] == m:
+                    gs[j] = m - 1 - i
+                j += 1
+
+    # 好后缀在搜索词中再次出现，取最靠右的一次
+    for i in range(m - 1):
+        gs[m - 1 - suff[i]] = m - 1 - i
+    return gs
+
+
+class Pattern(object):
+    """编译好的搜索词的基类，子类在构造时预先计算好各自的表并实现finditer
+
+    对象创建之后不再修改，查找时只用局部变量，可以在多个线程之间共用，
+    也可以拿同一个对象去查找成千上万个文件。
+    """
+
+    def __init__(self, search_str):
+        self.search_str = search_str
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self.search_str)
+
+    def __len__(self):
+        return len(self.search_str)
+
+    def search(self, source_str, start=0, end=None):
+        """返回第一次出现的位置，没有找到返回-1"""
+        for pos in self.finditer(source_str, start, end):
+            return pos
+        return -1
+
+    def finditer(self, source_str, start=0, end=None):
+        """依次返回在source_str[start:end]中每次出现的位置（可以重叠）
+
+        返回的位置是相对source_str开头的。空搜索词在每个位置都出现一次。
+        """
+        n = len(source_str) if end is None else min(end, len(source_str))
+        if not self.search_str:
+            return iter(range(start, n + 1))
+        return self._finditer(source_str, start, n)
+
+    def _finditer(self, source_str, start, n):
+        raise NotImplementedError
+
+    def count(self, source_str, start=0, end=None):
+        """统计出现的次数（可以重叠），不保存位置列表"""
+        count = 0
+        for _ in self.finditer(source_str, start, end):
+            count += 1
+        return count
+
+
+class BoyerMoore(Pattern):
+    """坏字符表和好后缀表只在构造时计算一次的Boyer-Moore查找"""
+
+    def __init__(self, search_str):
+        Pattern.__init__(self, search_str)
+        self.bad_char = bad_char_table(search_str)
+        self.good_suffix = tuple(good_suffix_table(search_str)) if search_str else ()
+
+    def _finditer(self, source_str, start, n):
+        # 完整匹配之后按好后缀表的gs[0]（搜索词的最小周期）后移，不退回到逐位比较，
+        # 整个查找仍然是亚线性的
+        search_str = self.search_str
+        m = len(search_str)
+        good_suffix = self.good_suffix
+        match_skip = good_suffix[0]
+        get = self.bad_char.get
+
+        # pos 为搜索词头部在源串中对齐的位置，每次从搜索词尾部开始倒退比较
+        pos = start
+        last = n - m
+        while pos <= last:
+            j = m - 1
+            while j >= 0 and search_str[j] == source_str[pos + j]:
+                j -= 1
+            if j < 0:
+                yield pos
+                pos += match_skip
+                continue
+            bad_char_skip = j - get(source_str[pos + j], -1)
+            good_suffix_skip = good_suffix[j]
+            if bad_char_skip > good_suffix_skip:
+                pos += bad_char_skip
+            else:
+                pos += good_suffix_skip
+
+
+_cache = {}
+_MAXCACHE = 100
+
+
+def compile(search_str):
+    """返回编译好的BoyerMoore对象，最近用过的搜索词会被缓存
+
+    已经编译好的对象（包括algorithms.py中的其它算法）原样返回，所以下面各个
+    查找函数的search_str参数既可以是字符串，也可以是编译好的对象
+    （查找文件时应编译bytes）。
+    """
+    # 不用isinstance：直接运行本脚本时本模块是__main__，algorithms.py导入的
+    # 是另一份search模块，两边的Pattern不是同一个类
+    if hasattr(search_str, 'finditer'):
+        return search_str
+    key = (type(search_str), search_str)
+    pattern = _cache.get(key)
+    if pattern is None:
+        if len(_cache) >= _MAXCACHE:
+            _cache.clear()
+        pattern = _cache[key] = BoyerMoore(search_str)
+    return pattern
+
+
+def boyer_moore_search(source_str, search_str, trace=False):
+    """在source_str中查找search_str，返回第一次出现的位置，没有找到返回-1
+
+    默认不打印任何信息，也不在查找过程中切片或创建后缀串，坏字符表和好后缀表
+    都是整数位移；trace=True 时使用下面的逐步打印版本，用来演示算法过程。
+    """
+    if trace:
+        return boyer_moore_trace(source_str, search_str)
+    return compile(search_str).search(source_str)
+
+
+def boyer_moore_finditer(source_str, search_str, start=0, end=None):
+    """依次返回search_str在source_str[start:end]中每次出现的位置（可以重叠）"""
+    return compile(search_str).finditer(source_str, start, end)
+
+
+def boyer_moore_count(source_str, search_str, start=0, end=None):
+    """统计search_str在source_str中出现的次数（可以重叠），不保存位置列表"""
+    return compile(search_str).count(source_str, start, end)
+
+
+def boyer_moore_trace(source_str, search_str):
+    """逐步打印的Boyer-Moore查找过程，找到时返回位置，否则返回-1"""
     gc.disable()
 
     source_str_len = len(source_str)
     search_str_len = len(search_str)
-    print 'source string length: %d, search string length: %d' \
-        % (source_str_len, search_str_len)
+    print('source string length: %d, search string length: %d'
+          % (source_str_len, search_str_len))
 
     # 计算坏字符的位置，需要注意的细节：
     # 1. 最后一个字符不需计算，因为是倒退匹配的，如果搜索串最后一个是坏字符的话，
@@ -23,7 +237,7 @@ def boyer_moore_search(source_str, search_str):
     bad_char = {}
     for index, char in enumerate(search_str[:search_str_len - 1]):
         bad_char[char] = index
-    print 'bad char dict created, ', bad_char
+    print('bad char dict created, ', bad_char)
 
     # 计算好后缀的位置
     # 这里计算两个值，一个是当它是最大后缀是的位置
@@ -31,14 +245,15 @@ def boyer_moore_search(source_str, search_str):
     good_suffix = {}
     for i in range(search_str_len - 1, 0, -1):
         suffix = search_str[i:]
-        pos1 = search_str[:i].rfind(suffix)
+        # 再次出现可以与好后缀重叠，只要不是好后缀本身
+        pos1 = search_str[:search_str_len - 1].rfind(suffix)
         if pos1 != -1:
             pos1 = pos1 + len(suffix) - 1
         pos2 = -1
         if search_str.startswith(suffix):
             pos2 = len(suffix) - 1
         good_suffix[suffix] = (pos1, pos2)
-    print 'good suffix dict created, ', good_suffix
+    print('good suffix dict created, ', good_suffix)
 
     # 第一步对齐，"字符串"与"搜索词"头部对齐，指针指向搜索词尾部
     source_str_ptr = search_str_ptr = search_str_len - 1
@@ -46,13 +261,14 @@ def boyer_moore_search(source_str, search_str):
     # 后缀指针，指向当前发现的后缀
     suffix_ptr = 0
     suffix_stack = []
+    result = -1
 
     while source_str_ptr < source_str_len:
-        print source_str_ptr, search_str_ptr, suffix_ptr,
+        print(source_str_ptr, search_str_ptr, suffix_ptr, end=' ')
         start = source_str_ptr-search_str_len+1
         if start < 0: start = 0
-        print '-------', source_str[start:source_str_ptr+search_str_len],
-        print '-------', search_str[0:search_str_ptr+1]
+        print('-------', source_str[start:source_str_ptr+search_str_len], end=' ')
+        print('-------', search_str[0:search_str_ptr+1])
         # 最后一个字符不相等，发现了 "坏字符"，需要向后跳
         if source_str[source_str_ptr] != search_str[search_str_ptr]:
             # 首先应用“坏字符规则”
@@ -65,38 +281,39 @@ def boyer_moore_search(source_str, search_str):
             if bad_char_last_pos > search_str_ptr:
                 bad_char_last_pos = search_str_ptr - 1#-1
             bad_char_skip_steps = search_str_ptr - bad_char_last_pos
-            print 'skip steps calculated by bad char rule is: %d' % bad_char_skip_steps
+            print('skip steps calculated by bad char rule is: %d' % bad_char_skip_steps)
 
             # 其次应用“好后缀规则”
             # 如果suffix_ptr，那么已经发现了好后缀，并且这些后缀存放在suffix_stack中
             skipsteps = 0
             if suffix_ptr != 0:
                 # 最长好后缀是否存在
-                print 'there is suffix'
+                print('there is suffix')
                 suf = suffix_stack.pop()
                 found = 0
                 if suf in good_suffix and good_suffix[suf][0] != -1:
-                    steps2 = good_suffix[suf]
-                    print 'find longest suffix.', suf
+                    steps2 = good_suffix[suf][0]
+                    print('find longest suffix.', suf)
                     found = 1
                 else:
-                    while 1:
-                        try:
-                            s = suffix_stack.pop()
-                            print 'caculate a suffix', s
-                            steps2 = good_suffix[s][1]
-                            if steps2 != -1 and steps2==(len(s)-1):
-                                print 'find a suffix', s
-                                found = 1
-                        except: break
+                    # 从最长的好后缀开始找同时是搜索词前缀的，找到即停
+                    suffix_stack.append(suf)
+                    while suffix_stack:
+                        s = suffix_stack.pop()
+                        print('caculate a suffix', s)
+                        steps2 = good_suffix[s][1]
+                        if steps2 != -1 and steps2==(len(s)-1):
+                            print('find a suffix', s)
+                            found = 1
+                            break
                 if found == 1:
                     skipsteps = (search_str_len - 1 - steps2)
-                    print 'skip steps by good suffix', search_str_ptr, skipsteps
+                    print('skip steps by good suffix', search_str_ptr, skipsteps)
 
             # 不存在，其余好后缀是否发生在头部
 
             steps = max(bad_char_skip_steps, skipsteps)
-            print 'choose skip steps', steps
+            print('choose skip steps', steps)
             source_str_ptr += steps
             source_str_ptr += suffix_ptr # 字符串到上次移动位置，去掉后缀影响
             # 发现了坏字符，将几个指针复原到对应位置
@@ -105,33 +322,433 @@ def boyer_moore_search(source_str, search_str):
 
         else:
             suffix_ptr += 1
-            #print "******", search_str[search_str_len - suffix_ptr:]
+            #print("******", search_str[search_str_len - suffix_ptr:])
             suffix_stack.append(search_str[search_str_len - suffix_ptr:])
             # 后缀与搜索词相等，则已经发现
             if suffix_ptr == search_str_len:
-                print 'found:', source_str_ptr, search_str_ptr, suffix_ptr
+                print('found:', source_str_ptr, search_str_ptr, suffix_ptr)
+                result = source_str_ptr
                 break
             # 前移一位，进行比较
             source_str_ptr = source_str_ptr - 1
             search_str_ptr = search_str_ptr - 1
     gc.enable()
+    return result
 
-if __name__ == '__main__':
-    if len(sys.argv) < 3:
-        print "USAGE: python %s search_string source_string/source_file_path [source_string/source_file_path]" % __file__
 
-    search_str = sys.argv[1]
+@contextlib.contextmanager
+def mapped_file(path):
+    """只读映射文件，with块内得到一个可以像bytes一样下标取值、切片的对象"""
+    with open(path, 'rb') as f:
+        # 空文件不能mmap，直接给一个空串
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''
+            return
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            # 顺序访问，提示内核预读并及时回收已经扫过的页
+            if hasattr(mm, 'madvise'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            yield mm
+        finally:
+            mm.close()
+
+
+def boyer_moore_search_file(path, search_str):
+    """在文件中查找search_str，返回第一次出现的字节偏移，没有找到返回-1"""
+    with mapped_file(path) as source_str:
+        return boyer_moore_search(source_str, _to_bytes(search_str))
+
+
+def boyer_moore_finditer_file(path, search_str, start=0, end=None):
+    """依次返回search_str在文件中每次出现的字节偏移，迭代结束后释放映射"""
+    with mapped_file(path) as source_str:
+        for pos in boyer_moore_finditer(source_str, _to_bytes(search_str), start, end):
+            yield pos
+
+
+def boyer_moore_count_file(path, search_str, start=0, end=None):
+    """统计search_str在文件中出现的次数"""
+    with mapped_file(path) as source_str:
+        return boyer_moore_count(source_str, _to_bytes(search_str), start, end)
+
 
-    for source in sys.argv[2:]:
-        if not os.path.exists(source):
-            boyer_moore_search(source, search_str)
+def _file_ranges(size, workers):
+    """把 [0, size) 切成若干段起始位置区间，段数是进程数的几倍，方便均衡负载"""
+    if size == 0:
+        return []
+    parts = max(1, min(workers * 4, size // CHUNK_SIZE))
+    step = -(-size // parts)
+    return [(start, min(start + step, size)) for start in range(0, size, step)]
+
+
+def _search_range(task):
+    """工作进程：自己映射文件，只报告起始位置落在 [start, end) 内的匹配"""
+    path, search_str, start, end, count_only = task
+    with mapped_file(path) as source_str:
+        # 向后多看 len(search_str)-1 字节，跨段的匹配由起始位置所在的段负责
+        end = min(end + len(search_str) - 1, len(source_str))
+        if count_only:
+            return boyer_moore_count(source_str, search_str, start, end)
+        return list(boyer_moore_finditer(source_str, search_str, start, end))
+
+
+def _map_ranges(path, search_str, workers, count_only):
+    search_str = _to_bytes(search_str)
+    workers = workers or multiprocessing.cpu_count()
+    size = os.path.getsize(path)
+    tasks = [(path, search_str, start, end, count_only)
+             for start, end in _file_ranges(size, workers)]
+    if not tasks:
+        # 空文件，和 mapped_file 一样不必启动进程
+        return
+    pool = multiprocessing.Pool(workers)
+    try:
+        # imap 按提交顺序返回结果，各段的偏移本身有序，直接拼接即可
+        for result in pool.imap(_search_range, tasks):
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def boyer_moore_finditer_parallel(path, search_str, workers=None):
+    """多进程查找文件，按偏移从小到大返回每次出现的位置
+
+    文件被切成若干段，每个工作进程自己mmap文件并查找自己的一段，
+    workers 默认为CPU个数。
+    """
+    if not search_str:
+        for pos in boyer_moore_finditer_file(path, search_str):
+            yield pos
+        return
+    for positions in _map_ranges(path, search_str, workers, False):
+        for pos in positions:
+            yield pos
+
+
+def boyer_moore_count_parallel(path, search_str, workers=None):
+    """多进程统计search_str在文件中出现的次数"""
+    if not search_str:
+        return boyer_moore_count_file(path, search_str)
+    return sum(_map_ranges(path, search_str, workers, True))
+
+
+def read_chunks(f, chunk_size=CHUNK_SIZE):
+    """把文件对象（管道、socket.makefile()等）按块读出来
+
+    管道、socket这类带缓冲的流用 read1，读到多少处理多少，数据来得慢时不必等满一块
+    才开始查找（python2的GzipFile等虽然有read1方法，调用时却会报错）。
+    """
+    read = f.read1 if isinstance(f, io.BufferedReader) else f.read
+    while True:
+        chunk = read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def boyer_moore_finditer_stream(chunks, search_str):
+    """在依次到来的字节块中查找，返回相对整个数据流开头的偏移
+
+    相邻两块之间保留 len(search_str)-1 字节的重叠，跨块的匹配也能找到，
+    而完全落在重叠部分里的匹配不可能存在，所以不会重复报告。
+    任何时候只持有当前块加上重叠部分。
+    """
+    search_str = _to_bytes(search_str)
+    pattern = compile(search_str)
+    m = len(search_str)
+    overlap_size = m - 1 if m else 0
+    # base 为 buf[0] 在整个数据流中的偏移
+    base = 0
+    overlap = b''
+    for chunk in chunks:
+        if not chunk:
+            continue
+        buf = overlap + chunk if overlap else chunk
+        if m == 0:
+            for pos in range(len(buf)):
+                yield base + pos
         else:
-            with open(source, "rb") as f:
-                source_file = f.read()
-                boyer_moore_search(source_file, search_str)
+            for pos in pattern.finditer(buf):
+                yield base + pos
+        keep = min(overlap_size, len(buf))
+        overlap = buf[len(buf) - keep:] if keep else b''
+        base += len(buf) - keep
+    if m == 0:
+        yield base
+
+
+def boyer_moore_count_stream(chunks, search_str):
+    """统计search_str在字节块流中出现的次数"""
+    count = 0
+    for _ in boyer_moore_finditer_stream(chunks, search_str):
+        count += 1
+    return count
+
+
+# 压缩文件的魔数和对应的流式解压文件类
+_DECOMPRESSORS = [
+    (b'\x1f\x8b', gzip.GzipFile),
+    (b'BZh', bz2.BZ2File),
+]
+try:
+    import lzma
+except ImportError:  # python 2.x 没有lzma
+    pass
+else:
+    _DECOMPRESSORS.append((b'\xfd7zXZ\x00', lzma.LZMAFile))
+
+
+def _decompressor(path):
+    """按文件开头的魔数返回解压文件类，不是压缩文件时返回None"""
+    with open(path, 'rb') as f:
+        magic = f.read(6)
+    for prefix, opener in _DECOMPRESSORS:
+        # bz2 的魔数后面还跟着块大小 1-9，多检查一个字节免得误认普通文本
+        if magic.startswith(prefix) and (prefix != b'BZh' or magic[3:4].isdigit()):
+            return opener
+    return None
+
+
+def open_compressed(path):
+    """path是gzip/bz2/xz压缩文件时返回一个边读边解压的文件对象，否则返回None"""
+    opener = _decompressor(path)
+    if opener is None:
+        return None
+    return opener(path, 'rb')
+
+
+def boyer_moore_finditer_compressed(path, search_str, chunk_size=CHUNK_SIZE):
+    """在压缩文件解压后的内容中查找，返回解压后数据中的偏移
+
+    解压出来的数据按块交给流式查找，不写临时文件，内存占用与压缩前后的文件大小无关。
+    """
+    f = open_compressed(path)
+    if f is None:
+        raise ValueError('%s is not a gzip, bz2 or xz file' % path)
+    with contextlib.closing(f):
+        for pos in boyer_moore_finditer_stream(read_chunks(f, chunk_size), search_str):
+            yield pos
+
 
+def boyer_moore_count_compressed(path, search_str, chunk_size=CHUNK_SIZE):
+    """统计search_str在压缩文件解压后的内容中出现的次数"""
+    count = 0
+    for _ in boyer_moore_finditer_compressed(path, search_str, chunk_size):
+        count += 1
+    return count
 
 
+def _blocks(source_str, start, end):
+    """把source_str[start:end]切成 (偏移, bytearray) 块，两个python版本下逐个取值都是整数"""
+    for block_start in range(start, end, BLOCK_SIZE):
+        yield block_start, bytearray(source_str[block_start:min(block_start + BLOCK_SIZE, end)])
 
 
+def _stream_blocks(chunks):
+    """同_blocks，偏移是相对整个数据流开头的"""
+    base = 0
+    for chunk in chunks:
+        for block_start in range(0, len(chunk), BLOCK_SIZE):
+            yield base + block_start, bytearray(chunk[block_start:block_start + BLOCK_SIZE])
+        base += len(chunk)
 
+
+def _stdin_bytes():
+    return getattr(sys.stdin, 'buffer', sys.stdin)
+
+
+def _collect(positions, mode):
+    """把位置迭代器按输出模式归纳成结果：first为位置，all为迭代器本身，count为次数，files为是否找到
+
+    all 模式原样返回迭代器，输出时边找边打印，不必等整个源查完，也不必把所有位置存下来。
+    """
+    if mode == 'count':
+        return sum(1 for _ in positions)
+    if mode == 'all':
+        return positions
+    for pos in positions:
+        return True if mode == 'files' else pos
+    return False if mode == 'files' else -1
+
+
+def _search_source(task, jobs=1):
+    """查找一个源，task 为 (类型, 名字, 源串, 搜索词, 输出模式, 是否trace)
+
+    压缩文件边解压边查找。all 模式返回位置的迭代器，文件在迭代结束时才关闭。
+    """
+    kind, source, source_str, pattern, mode, trace = task
+    if kind == 'stdin':
+        return _collect(boyer_moore_finditer_stream(read_chunks(_stdin_bytes()), pattern), mode)
+    if kind == 'file' and _decompressor(source) is not None:
+        return _collect(boyer_moore_finditer_compressed(source, pattern), mode)
+    if kind == 'text':
+        if trace:
+            return boyer_moore_search(source_str, pattern, trace=True)
+        if mode == 'count':
+            return boyer_moore_count(source_str, pattern)
+        return _collect(boyer_moore_finditer(source_str, pattern), mode)
+    if jobs > 1 and not trace:
+        if mode == 'count':
+            return boyer_moore_count_parallel(source, pattern, jobs)
+        return _collect(boyer_moore_finditer_parallel(source, pattern, jobs), mode)
+    if mode == 'all':
+        # 映射要保持到迭代结束
+        return _finditer_mapped(source, pattern)
+    with mapped_file(source) as source_str:
+        if trace:
+            return boyer_moore_search(source_str, pattern, trace=True)
+        if mode == 'count':
+            return boyer_moore_count(source_str, pattern)
+        return _collect(boyer_moore_finditer(source_str, pattern), mode)
+
+
+def _finditer_mapped(path, pattern):
+    with mapped_file(path) as source_str:
+        for pos in boyer_moore_finditer(source_str, pattern):
+            yield pos
+
+
+def _search_source_pooled(task):
+    """工作进程：只能把结果整个传回主进程，all 模式的迭代器在这里变成列表"""
+    result = _search_source(task)
+    if task[4] == 'all':
+        result = list(result)
+    return result
+
+
+def _print_result(source, result, mode):
+    """打印一个源的结果，和grep一样，没有找到的源什么也不打印"""
+    if mode == 'all':
+        for pos in result:
+            print('%s:%d' % (source, pos))
+            # 标准输入可能很久才来下一段，找到一个就输出一个
+            if source == '-':
+                sys.stdout.flush()
+    elif mode == 'files':
+        if result:
+            print(source)
+    elif mode == 'count' or result != -1:
+        print('%s:%d' % (source, result))
+
+
+def _expand_sources(sources, recursive):
+    """按命令行顺序展开源，目录按文件名排序递归展开，保证输出顺序确定"""
+    for source in sources:
+        if source != '-' and os.path.isdir(source):
+            if not recursive:
+                print('%s: Is a directory' % source, file=sys.stderr)
+                continue
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for name in sorted(files):
+                    yield 'file', os.path.join(root, name)
+        elif source == '-':
+            yield 'stdin', source
+        elif os.path.exists(source):
+            yield 'file', source
+        else:
+            yield 'text', source
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        usage='python %(prog)s [--trace | --all | --count | --files-with-matches] [-r] '
+              '[--jobs N] [--algorithm NAME] [-i] [-E] search_string '
+              'source_string/source_file_path/directory/- [...]')
+    parser.add_argument('search_str')
+    parser.add_argument('sources', nargs='+')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('-t', '--trace', action='store_true',
+                      help='print the step by step Boyer-Moore walkthrough, '
+                           'not available with -i, -E or another --algorithm')
+    mode.add_argument('-a', '--all', action='store_true',
+                      help='print the offset of every match')
+    mode.add_argument('-c', '--count', action='store_true',
+                      help='only print the number of matches')
+    mode.add_argument('-l', '--files-with-matches', action='store_true',
+                      help='only print the names of sources that match')
+    parser.add_argument('-r', '--recursive', action='store_true',
+                        help='search every file under directory sources')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='worker processes: one file is split into ranges, '
+                             'several files are searched concurrently')
+    parser.add_argument('--algorithm', default='auto',
+                        choices=['auto', 'bm', 'horspool', 'sunday', 'two-way', 'memchr'],
+                        help='single pattern algorithm, see algorithms.py')
+    parser.add_argument('-i', '--ignore-case', action='store_true',
+                        help='ignore ASCII letter case')
+    parser.add_argument('-E', '--byte-classes', action='store_true',
+                        help=r'search string may use \d \w \s . [a-z] [^...]')
+    args = parser.parse_args(argv)
+    if args.trace and (args.ignore_case or args.byte_classes or
+                       args.algorithm not in ('auto', 'bm')):
+        parser.error('--trace only walks through the plain Boyer-Moore search, '
+                     'it cannot be combined with -i, -E or another --algorithm')
+
+    if args.trace or (args.algorithm == 'bm' and not
+                      (args.ignore_case or args.byte_classes)):
+        text_pattern = args.search_str
+        bytes_pattern = _to_bytes(text_pattern)
+    else:
+        # algorithms.py 引用了本模块，只能在这里导入
+        from algorithms import compile as compile_algorithm
+        try:
+            text_pattern = compile_algorithm(args.search_str, args.algorithm,
+                                             args.ignore_case, args.byte_classes)
+            bytes_pattern = compile_algorithm(_to_bytes(args.search_str), args.algorithm,
+                                              args.ignore_case, args.byte_classes)
+        except ValueError as e:
+            # 例如 -E 的 [ 没有对应的 ]
+            parser.error(str(e))
+    # 按字节类查找只能用于字节数据，命令行上的源串也转成bytes
+    bytes_only = args.ignore_case or args.byte_classes
+
+    if args.count:
+        mode = 'count'
+    elif args.all:
+        mode = 'all'
+    elif args.files_with_matches:
+        mode = 'files'
+    else:
+        mode = 'first'
+
+    tasks = []
+    for kind, source in _expand_sources(args.sources, args.recursive):
+        if kind == 'text':
+            task = (kind, source, _to_bytes(source) if bytes_only else source,
+                    bytes_pattern if bytes_only else text_pattern, mode, args.trace)
+        else:
+            task = (kind, source, None, bytes_pattern, mode, args.trace)
+        tasks.append(task)
+
+    # 只有一个文件时在文件内部分段并行；多个源时每个源交给一个工作进程，
+    # imap 按提交顺序返回结果，输出顺序与串行时相同；标准输入只能在主进程中读
+    pooled = [task for task in tasks if task[0] != 'stdin']
+    if args.jobs > 1 and len(pooled) > 1 and not args.trace:
+        pool = multiprocessing.Pool(args.jobs)
+        results = pool.imap(_search_source_pooled, pooled)
+        jobs = 1
+    else:
+        pool = None
+        results = None
+        jobs = args.jobs
+    try:
+        for task in tasks:
+            if results is None or task[0] == 'stdin':
+                result = _search_source(task, jobs)
+            else:
+                result = next(results)
+            _print_result(task[1], result, mode)
+        if pool is not None:
+            pool.close()
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+
+if __name__ == '__main__':
+    main()
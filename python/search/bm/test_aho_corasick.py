@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+'''
+aho_corasick.py 的单元测试，与逐个搜索词暴力查找的结果对照。
+
+python -m unittest test_aho_corasick
+'''
+import random
+import unittest
+
+from aho_corasick import AhoCorasick, aho_corasick_finditer
+
+
+def _brute_force(source_str, search_strs):
+    matches = []
+    for index, search_str in enumerate(search_strs):
+        m = len(search_str)
+        for i in range(len(source_str) - m + 1):
+            if source_str[i:i + m] == search_str:
+                matches.append((i, index))
+    return sorted(matches, key=lambda match: (match[0] + len(search_strs[match[1]]), match))
+
+
+class TestAhoCorasick(unittest.TestCase):
+
+    def test_example(self):
+        search_strs = [b'he', b'she', b'his', b'hers']
+        matches = list(aho_corasick_finditer(b'ushers', search_strs))
+        self.assertEqual(sorted(matches), [(1, 1), (2, 0), (2, 3)])
+
+    def test_random(self):
+        random.seed(1975)
+        for _ in range(200):
+            source_str = ''.join(random.choice('abc') for _ in range(random.randint(0, 80)))
+            search_strs = [''.join(random.choice('abc') for _ in range(random.randint(1, 4)))
+                           for _ in range(random.randint(1, 6))]
+            source_str = source_str.encode('ascii')
+            search_strs = [s.encode('ascii') for s in search_strs]
+            automaton = AhoCorasick(search_strs)
+            expected = _brute_force(source_str, search_strs)
+            self.assertEqual(sorted(automaton.finditer(source_str)), sorted(expected))
+            self.assertEqual(automaton.count(source_str), len(expected))
+            chunks = [source_str[i:i + 7] for i in range(0, len(source_str), 7)]
+            self.assertEqual(sorted(automaton.finditer_stream(chunks)), sorted(expected))
+
+    def test_empty_pattern(self):
+        self.assertRaises(ValueError, AhoCorasick, [b'a', b''])
+        self.assertRaises(ValueError, AhoCorasick, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
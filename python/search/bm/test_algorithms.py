@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+'''
+algorithms.py 的单元测试，每种算法都与暴力查找的结果对照。
+
+python -m unittest test_algorithms
+'''
+import random
+import re
+import unittest
+
+import algorithms
+from algorithms import ALGORITHMS, ByteClassHorspool, choose_algorithm, parse_byte_classes
+
+
+def _all_positions(source_str, search_str):
+    return [i for i in range(len(source_str) - len(search_str) + 1)
+            if source_str[i:i + len(search_str)] == search_str]
+
+
+class TestAlgorithms(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(1994)
+
+    def _check(self, source_str, search_str):
+        expected = _all_positions(source_str, search_str)
+        for name, cls in ALGORITHMS.items():
+            pattern = cls(search_str)
+            self.assertEqual(list(pattern.finditer(source_str)), expected,
+                             '%s %r %r' % (name, source_str, search_str))
+            self.assertEqual(pattern.count(source_str), len(expected))
+            self.assertEqual(pattern.search(source_str), expected[0] if expected else -1)
+
+    def test_random(self):
+        for alphabet in ('ab', 'acgt', 'abcdefghijklmnop'):
+            for _ in range(300):
+                source_str = ''.join(random.choice(alphabet) for _ in range(random.randint(0, 80)))
+                search_str = ''.join(random.choice(alphabet) for _ in range(random.randint(1, 7)))
+                self._check(source_str, search_str)
+
+    def test_periodic(self):
+        for search_str in ('aaaa', 'abab', 'abaababaab', 'aab' * 12, 'a' * 40 + 'b'):
+            for source_str in ('a' * 100, 'ab' * 50, 'aab' * 40 + 'aaab', 'abaababaab' * 6):
+                self._check(source_str, search_str)
+
+    def test_range_and_bytes(self):
+        pattern = algorithms.compile(b'00200100', 'two-way')
+        self.assertEqual(list(pattern.finditer(b'0020010000200100', 1)), [8])
+        self.assertEqual(list(pattern.finditer(b'0020010000200100', 0, 15)), [0])
+        self.assertEqual(algorithms.compile(b'x').count(b'axbxc', 2), 1)
+        # memchr 也接受多字节的模式，重叠的匹配都要数
+        self.assertEqual(algorithms.compile(b'aa', 'memchr').count(b'aaaa'), 3)
+
+    def test_choose_algorithm(self):
+        self.assertEqual(choose_algorithm(b'E').__name__, 'SingleByte')
+        self.assertEqual(choose_algorithm(b'ERROR').__name__, 'Sunday')
+        self.assertEqual(choose_algorithm(b'ACGTTGCAAGAA').__name__, 'Horspool')
+        self.assertEqual(choose_algorithm(b'ab' * 20).__name__, 'TwoWay')
+        self.assertEqual(choose_algorithm(b'connection reset by peer').__name__, 'BoyerMoore')
+
+
+class TestByteClasses(unittest.TestCase):
+
+    def _check(self, source_str, search_str, regex, **kwargs):
+        pattern = ByteClassHorspool(search_str, **kwargs)
+        flags = re.IGNORECASE if kwargs.get('ignore_case') else 0
+        expected = [m.start() for m in re.finditer(b'(?=' + regex + b')', source_str, flags)]
+        self.assertEqual(list(pattern.finditer(source_str)), expected)
+
+    def test_ignore_case(self):
+        source_str = b'Error ERROR error eRRoR err0r'
+        self.assertEqual(list(ByteClassHorspool(b'error', ignore_case=True, classes=False)
+                              .finditer(source_str)), [0, 6, 12, 18])
+        random.seed(7)
+        for _ in range(200):
+            source_str = ''.join(random.choice('aAbB') for _ in range(60)).encode('ascii')
+            search_str = ''.join(random.choice('abAB') for _ in range(random.randint(1, 5)))
+            self._check(source_str, search_str.encode('ascii'), search_str.encode('ascii'),
+                        ignore_case=True, classes=False)
+
+    def test_classes(self):
+        source_str = b'12:30:05 ab.c a-c [x] 9a_Z'
+        self._check(source_str, br'\d\d:\d\d', br'\d\d:\d\d')
+        self._check(source_str, b'a.c', b'a.c')
+        self._check(source_str, br'a\.c', br'a\.c')
+        self._check(source_str, b'[0-9][^0-9]', b'[0-9][^0-9]')
+        self._check(source_str, br'\w\s', br'\w\s')
+        self._check(source_str, br'[A-Z_]\w', br'[A-Z_]\w', ignore_case=True)
+
+    def test_negated_ignore_case(self):
+        # 先折叠大小写再取补集，[^a] 既不匹配 a 也不匹配 A
+        self.assertEqual(ByteClassHorspool(b'[^a]', ignore_case=True).count(b'aAb'), 1)
+        self._check(b'aAbBcaC', b'[^a][^B]', b'[^a][^B]', ignore_case=True)
+        self._check(b'x-Y xy X_y', b'x[^A-Z]y', b'x[^A-Z]y', ignore_case=True)
+
+    def test_parse(self):
+        self.assertEqual(len(parse_byte_classes(br'\d[a-c]x.')), 4)
+        self.assertEqual(parse_byte_classes(b'[]a]')[0], frozenset(bytearray(b']a')))
+        self.assertRaises(ValueError, parse_byte_classes, b'[abc')
+        self.assertEqual(len(ByteClassHorspool(br'\d\d')), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
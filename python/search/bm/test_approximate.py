@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+'''
+approximate.py 的单元测试，与动态规划求编辑距离、逐位比较的结果对照。
+
+python -m unittest test_approximate
+'''
+import random
+import unittest
+
+from approximate import Approximate, approximate_finditer
+
+
+def _edit_matches(source_str, search_str, k):
+    """Sellers算法：每个结束位置上最少的错误数"""
+    m = len(search_str)
+    column = list(range(m + 1))
+    matches = []
+    for j, c in enumerate(source_str, 1):
+        prev = column
+        column = [0]
+        for i in range(1, m + 1):
+            cost = 0 if search_str[i - 1] == c else 1
+            column.append(min(prev[i - 1] + cost, prev[i] + 1, column[i - 1] + 1))
+        if column[m] <= k:
+            matches.append((j, column[m]))
+    return matches
+
+
+def _hamming_matches(source_str, search_str, k):
+    m = len(search_str)
+    matches = []
+    for i in range(len(source_str) - m + 1):
+        errors = sum(1 for a, b in zip(source_str[i:i + m], search_str) if a != b)
+        if errors <= k:
+            matches.append((i, errors))
+    return matches
+
+
+class TestApproximate(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(1992)
+
+    def test_example(self):
+        source_str = b'connection reset by peer; conection rest by peer'
+        self.assertEqual(list(approximate_finditer(source_str, b'connection', 1)),
+                         [(9, 1), (10, 0), (11, 1), (35, 1)])
+        self.assertEqual(list(approximate_finditer(source_str, b'reset', 1, hamming=True)),
+                         [(11, 0)])
+        # python3中str的源串也先转成bytes，长短模式都一样
+        self.assertEqual(list(approximate_finditer(u'say hello world', u'hello world', 1)),
+                         [(14, 1), (15, 0)])
+        self.assertEqual(list(approximate_finditer(u'say hello', u'helo', 1)),
+                         list(approximate_finditer(b'say hello', b'helo', 1)))
+
+    def _random_case(self, min_m):
+        source_str = ''.join(random.choice('abc') for _ in range(random.randint(0, 120)))
+        search_str = ''.join(random.choice('abc') for _ in range(random.randint(min_m, 12)))
+        return source_str.encode('ascii'), search_str.encode('ascii')
+
+    def test_random(self):
+        for k in (0, 1, 2, 3):
+            for _ in range(150):
+                source_str, search_str = self._random_case(k + 1)
+                for pattern in (Approximate(search_str, k), Approximate(search_str, k, True)):
+                    if pattern.hamming:
+                        expected = _hamming_matches(source_str, search_str, k)
+                    else:
+                        expected = _edit_matches(bytearray(source_str), bytearray(search_str), k)
+                    self.assertEqual(list(pattern.finditer(source_str)), expected)
+                    chunks = [source_str[i:i + 7] for i in range(0, len(source_str), 7)]
+                    self.assertEqual(list(pattern.finditer_stream(chunks)), expected)
+
+    def test_filter_used(self):
+        self.assertTrue(Approximate(b'abcdefgh', 1).pieces is not None)
+        self.assertTrue(Approximate(b'abcd', 3).pieces is None)
+        # 不切段时逐字节扫描，结果应当相同
+        random.seed(3)
+        for _ in range(100):
+            source_str, search_str = self._random_case(9)
+            filtered = Approximate(search_str, 2)
+            scanned = Approximate(search_str, 2)
+            scanned.pieces = None
+            self.assertEqual(list(filtered.finditer(source_str)), list(scanned.finditer(source_str)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+'''
+search.py 的单元测试，随机生成源串和搜索词，与内置的find结果对照。
+
+python -m unittest test_search
+'''
+import bz2
+import gzip
+import io
+import os
+import random
+import shutil
+import sys
+import tempfile
+import unittest
+
+import search
+from search import (
+    boyer_moore_count,
+    boyer_moore_count_file,
+    boyer_moore_count_parallel,
+    boyer_moore_finditer,
+    boyer_moore_finditer_file,
+    boyer_moore_finditer_parallel,
+    boyer_moore_finditer_stream,
+    boyer_moore_count_stream,
+    read_chunks,
+    boyer_moore_search,
+    boyer_moore_search_file,
+    good_suffix_table,
+    )
+
+
+def _random_str(alphabet, n):
+    return ''.join(random.choice(alphabet) for _ in range(n))
+
+
+def _all_positions(source_str, search_str):
+    return [i for i in range(len(source_str) - len(search_str) + 1)
+            if source_str[i:i + len(search_str)] == search_str]
+
+
+class TestBoyerMooreSearch(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(20130503)
+
+    def test_examples(self):
+        self.assertEqual(boyer_moore_search("HERE IS A SIMPLE EXAMPLE", "EXAMPLE"), 17)
+        self.assertEqual(boyer_moore_search("00000200100", "00200100"), 3)
+        self.assertEqual(boyer_moore_search(b"00000200100", b"00200100"), 3)
+        self.assertEqual(boyer_moore_search("HERE IS A SIMPLE EXAMPLE", "EXAMPLES"), -1)
+        self.assertEqual(boyer_moore_search("abc", ""), 0)
+        self.assertEqual(boyer_moore_search("", "a"), -1)
+
+    def test_trace_mode(self):
+        self.assertEqual(boyer_moore_search("HERE IS A SIMPLE EXAMPLE", "EXAMPLE", trace=True), 17)
+        # 好后缀是搜索词前缀、与好后缀重叠再次出现的情况
+        self.assertEqual(boyer_moore_search("xERRORx", "ERR", trace=True), 1)
+        self.assertEqual(boyer_moore_search("abbbaaab", "bbb", trace=True), 1)
+        self.assertEqual(boyer_moore_search("acacacbabaaaaa", "abaaaa", trace=True), 7)
+
+    def test_good_suffix_table(self):
+        # ANPANMAN 的好后缀表，见维基百科 Boyer-Moore 词条
+        self.assertEqual(good_suffix_table("ANPANMAN"), [6, 6, 6, 6, 6, 3, 8, 1])
+        self.assertEqual(good_suffix_table("aaaa"), [1, 2, 3, 4])
+
+    def test_random(self):
+        for alphabet in ('ab', '012', 'abcdefghij'):
+            for _ in range(300):
+                source_str = _random_str(alphabet, random.randint(0, 60))
+                search_str = _random_str(alphabet, random.randint(1, 6))
+                self.assertEqual(boyer_moore_search(source_str, search_str),
+                                 source_str.find(search_str))
+
+    def test_compiled_pattern(self):
+        pattern = search.compile("00200100")
+        self.assertTrue(search.compile("00200100") is pattern)
+        self.assertEqual(pattern.search("00000200100"), 3)
+        self.assertEqual(pattern.search("00000200100", 4), -1)
+        self.assertEqual(list(pattern.finditer("002001002001000")), [0, 6])
+        self.assertEqual(pattern.count("002001002001000"), 2)
+        self.assertEqual(boyer_moore_search("00000200100", pattern), 3)
+
+    def test_finditer_and_count(self):
+        self.assertEqual(list(boyer_moore_finditer("aaaaa", "aa")), [0, 1, 2, 3])
+        self.assertEqual(list(boyer_moore_finditer("abcabcabc", "abc", 1, 8)), [3])
+        self.assertEqual(boyer_moore_count("abababa", "aba"), 3)
+        for alphabet in ('ab', '0123'):
+            for _ in range(300):
+                source_str = _random_str(alphabet, random.randint(0, 80))
+                search_str = _random_str(alphabet, random.randint(1, 5))
+                expected = _all_positions(source_str, search_str)
+                self.assertEqual(list(boyer_moore_finditer(source_str, search_str)), expected)
+                self.assertEqual(boyer_moore_count(source_str, search_str), len(expected))
+
+    def test_stream(self):
+        for _ in range(200):
+            source_str = _random_str('ab', random.randint(0, 100)).encode('ascii')
+            search_str = _random_str('ab', random.randint(1, 6)).encode('ascii')
+            size = random.randint(1, 10)
+            chunks = [source_str[i:i + size] for i in range(0, len(source_str), size)]
+            expected = _all_positions(source_str, search_str)
+            self.assertEqual(list(boyer_moore_finditer_stream(chunks, search_str)), expected)
+            self.assertEqual(boyer_moore_count_stream(iter(chunks), search_str), len(expected))
+
+    def test_read_chunks(self):
+        f = io.BytesIO(b'0' * 100 + b'00200100' + b'1' * 100)
+        self.assertEqual(list(boyer_moore_finditer_stream(read_chunks(f, 7), '00200100')), [100])
+        # 管道里已经有的数据先交出来，不等满一块或EOF
+        r, w = os.pipe()
+        with io.open(r, 'rb') as f:
+            os.write(w, b'xx00200100')
+            matches = boyer_moore_finditer_stream(read_chunks(f), '00200100')
+            self.assertEqual(next(matches), 2)
+            os.close(w)
+            self.assertEqual(list(matches), [])
+
+
+class TestFileSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def _write(self, name, data):
+        path = os.path.join(self.tmpdir, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_mmap_search(self):
+        data = b'x' * 10000 + b'00200100' + b'y' * 5000 + b'00200100'
+        path = self._write('data.bin', data)
+        self.assertEqual(boyer_moore_search_file(path, '00200100'), 10000)
+        self.assertEqual(list(boyer_moore_finditer_file(path, b'00200100')), [10000, 15008])
+        self.assertEqual(boyer_moore_count_file(path, '00200100'), 2)
+        self.assertEqual(boyer_moore_search_file(path, 'z'), -1)
+        pattern = search.compile(b'00200100')
+        self.assertEqual(boyer_moore_count_file(path, pattern), 2)
+        self.assertEqual(list(boyer_moore_finditer_stream([data[:10003], data[10003:]], pattern)),
+                         [10000, 15008])
+
+    def test_parallel(self):
+        random.seed(5)
+        data = _random_str('ab', 20000).encode('ascii')
+        path = self._write('random.bin', data)
+        expected = _all_positions(data, b'abba')
+        # 把段切得很小，保证有跨段的匹配
+        chunk_size, search.CHUNK_SIZE = search.CHUNK_SIZE, 97
+        try:
+            positions = list(boyer_moore_finditer_parallel(path, 'abba', 3))
+            count = boyer_moore_count_parallel(path, 'abba', 3)
+        finally:
+            search.CHUNK_SIZE = chunk_size
+        self.assertEqual(positions, expected)
+        self.assertEqual(count, len(expected))
+        empty = self._write('empty.log', b'')
+        self.assertEqual(list(boyer_moore_finditer_parallel(empty, 'abba', 2)), [])
+        self.assertEqual(boyer_moore_count_parallel(empty, 'abba', 2), 0)
+
+    def test_expand_sources(self):
+        os.makedirs(os.path.join(self.tmpdir, 'b', 'c'))
+        a = self._write('a.log', b'x')
+        c = self._write(os.path.join('b', 'c', 'c.log'), b'x')
+        b = self._write(os.path.join('b', 'b.log'), b'x')
+        self.assertEqual(list(search._expand_sources([self.tmpdir, '-', 'text'], True)),
+                         [('file', a), ('file', b), ('file', c), ('stdin', '-'), ('text', 'text')])
+
+    def test_search_source(self):
+        path = self._write('data.bin', b'abcabcab')
+        task = lambda mode: ('file', path, None, b'ab', mode, False)
+        self.assertEqual(search._search_source(task('first')), 0)
+        self.assertEqual(list(search._search_source(task('all'))), [0, 3, 6])
+        self.assertEqual(search._search_source_pooled(task('all')), [0, 3, 6])
+        self.assertEqual(search._search_source(task('count')), 3)
+        self.assertEqual(search._search_source(task('files')), True)
+        self.assertEqual(search._search_source(('text', 'xyz', 'xyz', 'ab', 'files', False)), False)
+        self.assertEqual(search._search_source(('text', 'xyz', 'xyz', 'ab', 'first', False)), -1)
+
+    def test_main_output(self):
+        a = self._write('a.log', b'xx ERROR ERROR')
+        self._write('z.log', b'nothing')
+        stdout = sys.stdout
+        sys.stdout = out = io.StringIO() if sys.version_info[0] > 2 else io.BytesIO()
+        try:
+            search.main(['-r', 'ERROR', self.tmpdir])
+            search.main(['-a', '-r', 'ERROR', self.tmpdir])
+        finally:
+            sys.stdout = stdout
+        # 没有找到的文件什么也不打印
+        self.assertEqual(out.getvalue(), '%s:3\n%s:3\n%s:9\n' % (a, a, a))
+
+    def test_main_errors(self):
+        stderr = sys.stderr
+        sys.stderr = io.StringIO() if sys.version_info[0] > 2 else io.BytesIO()
+        try:
+            # 不完整的 [ 和 trace 不支持的选项都给出用法错误，而不是异常
+            for argv in (['-E', '[ab', 'x'], ['-t', '-i', 'error', 'xERRORx'],
+                         ['-t', '-E', 'E.R', 'xERRORx'], ['-t', '--algorithm', 'sunday', 'E', 'x']):
+                self.assertRaises(SystemExit, search.main, argv)
+        finally:
+            sys.stderr = stderr
+
+    def test_compressed(self):
+        data = b'x' * 300000 + b'00200100' + b'y' * 300000 + b'00200100'
+        path = os.path.join(self.tmpdir, 'data.gz')
+        f = gzip.GzipFile(path, 'wb')
+        f.write(data)
+        f.close()
+        path_bz2 = self._write('data.bz2', bz2.compress(data))
+        for p in (path, path_bz2):
+            self.assertEqual(list(search.boyer_moore_finditer_compressed(p, '00200100', 1000)),
+                             [300000, 600008])
+            self.assertEqual(search._search_source(('file', p, None, b'00200100', 'count', False)), 2)
+        plain = self._write('plain.txt', b'BZh is not bzip2')
+        self.assertTrue(search.open_compressed(plain) is None)
+        self.assertRaises(ValueError, list, search.boyer_moore_finditer_compressed(plain, 'x'))
+
+    def test_empty_file(self):
+        path = self._write('empty.bin', b'')
+        self.assertEqual(boyer_moore_search_file(path, 'a'), -1)
+        self.assertEqual(boyer_moore_count_file(path, 'a'), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+'''
+suffix_array.py 的单元测试，与直接排序所有后缀、逐位置比较的结果对照。
+
+python -m unittest test_suffix_array
+'''
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+import suffix_array
+from suffix_array import SuffixArrayIndex, build_index, build_lcp, build_suffix_array
+
+
+class TestSuffixArray(unittest.TestCase):
+
+    def setUp(self):
+        random.seed(2016)
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_build(self):
+        for _ in range(100):
+            data = ''.join(random.choice('abc') for _ in range(random.randint(0, 60))).encode('ascii')
+            sa = build_suffix_array(data)
+            self.assertEqual(list(sa), sorted(range(len(data)), key=lambda i: data[i:]))
+            lcp = build_lcp(data, sa)
+            for i in range(1, len(sa)):
+                a, b = data[sa[i - 1]:], data[sa[i]:]
+                h = 0
+                while h < min(len(a), len(b)) and a[h:h + 1] == b[h:h + 1]:
+                    h += 1
+                self.assertEqual(lcp[i], h)
+
+    def test_pure_python(self):
+        # 没有numpy时的纯Python倍增，结果与numpy的相同
+        np, suffix_array.np = suffix_array.np, None
+        try:
+            for _ in range(50):
+                data = ''.join(random.choice('ab') for _ in range(random.randint(0, 60))).encode('ascii')
+                self.assertEqual(list(build_suffix_array(data)),
+                                 sorted(range(len(data)), key=lambda i: data[i:]))
+        finally:
+            suffix_array.np = np
+
+    def test_query(self):
+        data = ''.join(random.choice('ab') for _ in range(2000)).encode('ascii') + b'00200100'
+        corpus = os.path.join(self.tmpdir, 'corpus.bin')
+        with open(corpus, 'wb') as f:
+            f.write(data)
+        build_index(corpus)
+        with SuffixArrayIndex(corpus) as index:
+            for search_str in (b'a', b'abba', b'babab', b'aaaaaaaaaaaaaaaaaaaaaa', b'00200100', b'c'):
+                expected = [i for i in range(len(data)) if data.startswith(search_str, i)]
+                self.assertEqual(list(index.finditer(search_str)), expected)
+                self.assertEqual(index.count(search_str), len(expected))
+                self.assertEqual(index.search(search_str), expected[0] if expected else -1)
+
+    def test_stale_index(self):
+        corpus = os.path.join(self.tmpdir, 'corpus.bin')
+        with open(corpus, 'wb') as f:
+            f.write(b'HERE IS A SIMPLE EXAMPLE')
+        build_index(corpus)
+        with open(corpus, 'ab') as f:
+            f.write(b'!')
+        self.assertRaises(ValueError, SuffixArrayIndex, corpus)
+
+
+if __name__ == '__main__':
+    unittest.main()